@@ -1,110 +1,1026 @@
 import os
+import re
 import json
+import asyncio
+import time
+import hashlib
+import unicodedata
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from typing import List
+from typing import Callable, Dict, List, Optional
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
 from pydantic import BaseModel, Field
+from cache import SqliteCache
+from steam_api import cached_game_details, prefetch_game_details
+from store_classifier import GENRE_LABELS, PLAY_STYLE_LABELS, classify_from_store
+from library_context import estimate_tokens
+from metrics import span, incr, timed_import
+from singleflight import SingleFlight, AsyncSingleFlight
+from model_router import ModelEndpoint, ModelRouter, MODEL_QUOTAS, parse_quotas
+
+MODEL_NAME = "gemini-2.5-flash-lite"
+# Models per purpose; a fallback model (if set) takes over on errors, slowness or exhausted quota
+CHAT_MODEL = os.getenv("CHAT_MODEL", MODEL_NAME)
+CLASSIFY_MODEL = os.getenv("CLASSIFY_MODEL", MODEL_NAME)
+FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "")
+# Bump whenever the classification prompt or schema changes so stale cache entries are ignored
+PROMPT_VERSION = "v4"
+CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", str(30 * 24 * 3600)))
+CLASSIFICATION_CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_MAX_ENTRIES", "100000"))
+# Games per LLM request and parallel requests; keep concurrency within the Gemini rate limit
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "40"))
+CLASSIFY_MAX_CONCURRENCY = int(os.getenv("CLASSIFY_MAX_CONCURRENCY", "4"))
+CLASSIFY_MAX_RETRIES = int(os.getenv("CLASSIFY_MAX_RETRIES", "1"))
+# Send "app_id|name" lines and bind the schema natively instead of prose format instructions
+CLASSIFY_COMPACT = os.getenv("CLASSIFY_COMPACT", "1") != "0"
+# First-turn answers are reused for the same library context, normalized question and language
+CHAT_PROMPT_VERSION = "v1"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(6 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+# Chat memory: recent messages kept verbatim per session, older ones summarized
+MEMORY_WINDOW_MESSAGES = int(os.getenv("MEMORY_WINDOW_MESSAGES", "12"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "500"))
+MEMORY_IDLE_TTL = float(os.getenv("MEMORY_IDLE_TTL", str(2 * 3600)))
+# Threads folding trimmed messages into the rolling summary, off the response path
+MEMORY_SUMMARY_WORKERS = int(os.getenv("MEMORY_SUMMARY_WORKERS", "2"))
+DEFAULT_SESSION = "default"
+
+def normalize_query(text: str) -> str:
+    """
+    Folds trivial differences (case, width, spacing, punctuation) out of a chat question.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+_summary_executor: Optional[ThreadPoolExecutor] = None
+_summary_executor_lock = threading.Lock()
+
+
+def _get_summary_executor() -> ThreadPoolExecutor:
+    global _summary_executor
+    with _summary_executor_lock:
+        if _summary_executor is None:
+            _summary_executor = ThreadPoolExecutor(max_workers=MEMORY_SUMMARY_WORKERS,
+                                                   thread_name_prefix="memory-summary")
+        return _summary_executor
+
 
 class SimpleMemory:
-    def __init__(self):
+    """
+    Sliding-window chat memory. Once the history exceeds `max_messages` or `token_budget`
+    it is trimmed to half of both, and the dropped messages are folded into a rolling
+    summary by `summarizer(summary, messages)` on a background thread. Until then they
+    stay visible as history, so no context is lost in between.
+    """
+
+    def __init__(self, max_messages: int = MEMORY_WINDOW_MESSAGES, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 summarizer: Optional[Callable] = None):
         self.chat_history = []
+        self.summary = ""
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        # Trimmed messages not yet in the summary, and the run folding them in
+        self._unsummarized = []
+        self._summary_future = None
+        self._lock = threading.Lock()
 
     def load_memory_variables(self, _):
         # Format history as (role, content) logic if needed, 
         # but for ChatGoogleGenerativeAI we usually pass a list of messages.
-        return {"chat_history": self.chat_history}
+        with self._lock:
+            return {
+                "chat_history": self._unsummarized + self.chat_history,
+                "conversation_summary": self.summary or "(none)"
+            }
 
     def save_context(self, inputs, outputs):
         # inputs is usually {"question": ...}, outputs is {"output": ...}
         input_text = inputs.get("question") or inputs.get("input")
         output_text = outputs.get("output") or outputs.get("text")
         
-        if input_text:
-            from langchain_core.messages import HumanMessage
-            self.chat_history.append(HumanMessage(content=input_text))
-        if output_text:
-            from langchain_core.messages import AIMessage
-            self.chat_history.append(AIMessage(content=output_text))
+        with self._lock:
+            if input_text:
+                from langchain_core.messages import HumanMessage
+                self.chat_history.append(HumanMessage(content=input_text))
+            if output_text:
+                from langchain_core.messages import AIMessage
+                self.chat_history.append(AIMessage(content=output_text))
+
+        self._trim()
+
+    def _history_tokens(self) -> int:
+        return sum(estimate_tokens(str(message.content)) for message in self.chat_history)
+
+    def _over(self, max_messages: int, token_budget: int) -> bool:
+        return len(self.chat_history) > max_messages or self._history_tokens() > token_budget
+
+    def _trim(self):
+        with self._lock:
+            if not self._over(self.max_messages, self.token_budget):
+                return
+            # Trimming well below the limits means the summarizer runs every few turns,
+            # not on every turn once the window is full
+            max_messages, token_budget = max(2, self.max_messages // 2), self.token_budget // 2
+            overflow = []
+            # Drop whole question/answer pairs so the window never starts with an answer
+            while len(self.chat_history) > 2 and self._over(max_messages, token_budget):
+                overflow.extend(self.chat_history[:2])
+                del self.chat_history[:2]
+
+            if not overflow or not self.summarizer:
+                return
+            self._unsummarized.extend(overflow)
+            if self._summary_future is not None:
+                # The running summary picks these up when it is done
+                return
+            self._summary_future = _get_summary_executor().submit(self._summarize)
+
+    def _summarize(self):
+        while True:
+            with self._lock:
+                summary, messages = self.summary, list(self._unsummarized)
+            try:
+                summary = self.summarizer(summary, messages)
+            except Exception as e:
+                print(f"Error summarizing conversation: {e}")
+                summary = None
+
+            with self._lock:
+                # A failed summary drops its messages rather than retrying them every turn
+                if summary is not None:
+                    self.summary = summary
+                del self._unsummarized[:len(messages)]
+                if not self._unsummarized:
+                    self._summary_future = None
+                    return
+
+
+class SessionMemoryStore:
+    """
+    Per-session memories with LRU eviction of idle sessions, so a long-running
+    server keeps a bounded number of conversations in process memory.
+    """
+
+    def __init__(self, max_sessions: int = MEMORY_MAX_SESSIONS, idle_ttl: float = MEMORY_IDLE_TTL,
+                 summarizer: Optional[Callable] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.summarizer = summarizer
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SimpleMemory:
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._sessions:
+                memory, _ = self._sessions.pop(session_id)
+            else:
+                memory = SimpleMemory(summarizer=self.summarizer)
+            self._sessions[session_id] = (memory, now)
+
+            # Oldest entries come first; drop idle ones, then anything over capacity
+            while self._sessions:
+                oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+                if oldest_id == session_id:
+                    break
+                if now - last_used > self.idle_ttl or len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                else:
+                    break
+            return memory
+
+    def reset(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Records LLM token usage reported by the model into the shared metrics, labelled by purpose.
+    Also keeps running totals so a single call can report what it spent.
+    """
+
+    def __init__(self, purpose: str, model: str):
+        self.purpose = purpose
+        self.model = model
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        # Batched chains report from several threads at once
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        incr("llm_prompt_tokens_total", prompt_tokens, purpose=self.purpose, model=self.model)
+        incr("llm_completion_tokens_total", completion_tokens, purpose=self.purpose, model=self.model)
+        incr("llm_requests_total", purpose=self.purpose, model=self.model)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.requests += 1
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "requests": self.requests,
+            }
+
+GENRE_HINT = f"one of: {', '.join(GENRE_LABELS)}"
+PLAY_STYLE_HINT = f"one of: {', '.join(PLAY_STYLE_LABELS)}"
 
 class GameClassification(BaseModel):
     game_name: str = Field(description="Name of the game")
-    genre: str = Field(description="Main genre of the game (e.g., RPG, FPS, Strategy, Puzzle)")
-    play_style: str = Field(description="Play style (e.g., Single-player, Multiplayer, Co-op)")
+    genre: str = Field(description=f"Main genre of the game, {GENRE_HINT}")
+    play_style: str = Field(description=f"Play style, {PLAY_STYLE_HINT}")
     vibe: str = Field(description="Vibe or difficulty (e.g., Casual, Hardcore, Story-rich)")
 
 class GameList(BaseModel):
     games: List[GameClassification]
 
+class GameVibe(BaseModel):
+    game_name: str = Field(description="Name of the game")
+    vibe: str = Field(description="Vibe or difficulty (e.g., Casual, Hardcore, Story-rich)")
+
+class GameVibeList(BaseModel):
+    games: List[GameVibe]
+
+class CompactClassification(BaseModel):
+    app_id: int = Field(description="app_id from the input line")
+    genre: str = Field(description=f"Main genre, {GENRE_HINT}")
+    play_style: str = Field(description=f"Play style, {PLAY_STYLE_HINT}")
+    vibe: str = Field(description="Vibe or difficulty (e.g., Casual, Hardcore, Story-rich)")
+
+class CompactGameList(BaseModel):
+    games: List[CompactClassification]
+
+class CompactVibe(BaseModel):
+    app_id: int = Field(description="app_id from the input line")
+    vibe: str = Field(description="Vibe or difficulty (e.g., Casual, Hardcore, Story-rich)")
+
+class CompactVibeList(BaseModel):
+    games: List[CompactVibe]
+
 class AIRecommender:
-    def __init__(self):
+    def __init__(self, llm=None, router: Optional[ModelRouter] = None):
+        # An explicit chat model (e.g. a fake one in the benchmark) serves every purpose
+        if router is None and llm is not None:
+            router = ModelRouter.single(llm, getattr(llm, "model_name", None) or MODEL_NAME)
+        self.router = router or self._build_router()
+        # Classifications are cached under the model meant to produce them
+        self.model_name = self.router.primary("classify").name
+        self.llm = self.router.primary("chat").llm
+        
+        # Use our simple memory to avoid 'langchain.memory' import issues.
+        # One recommender is shared per API key, so memories are kept per session.
+        self.sessions = SessionMemoryStore(summarizer=self._summarize_history)
+
+        # Shared on-disk store so games classified by any session skip the LLM
+        try:
+            self.classification_cache = SqliteCache(
+                "classifications",
+                ttl=CLASSIFICATION_CACHE_TTL,
+                max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES
+            )
+        except Exception as e:
+            print(f"Warning: classification cache unavailable: {e}")
+            self.classification_cache = None
+
+        # Sessions asking for the same uncached game at the same time share one LLM request
+        self.classification_flight = SingleFlight("classifications")
+        self.classification_aflight = AsyncSingleFlight("classifications")
+
+        try:
+            self.response_cache = SqliteCache(
+                "responses",
+                ttl=RESPONSE_CACHE_TTL,
+                max_entries=RESPONSE_CACHE_MAX_ENTRIES
+            )
+        except Exception as e:
+            print(f"Warning: response cache unavailable: {e}")
+            self.response_cache = None
+
+    @staticmethod
+    def _build_gemini(model_name: str):
         # Try finding API Key or load from safe location
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
         if not api_key:
             # We don't raise error immediately to allow UI to handle it gracefully if key is missing
             print("Warning: GOOGLE_API_KEY not set.")
-        
-        # If imports fail here, it's likely a packaging issue, but these are essential
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
+
+        # If imports fail here, it's likely a packaging issue, but these are essential.
+        # The Gemini SDK is slow to import, so it is only loaded when a client is built.
+        ChatGoogleGenerativeAI = timed_import("langchain_google_genai").ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model_name,
             temperature=0.3,
             convert_system_message_to_human=True,
             google_api_key=api_key
         )
-        
-        # Use our simple memory to avoid 'langchain.memory' import issues
-        self.memory = SimpleMemory()
 
-    def classify_games(self, game_names: List[str]):
+    def _build_router(self) -> ModelRouter:
+        """
+        Separate clients for chat and classification (one per distinct model name, so a
+        shared model also shares its quota), each followed by FALLBACK_MODEL if configured.
+        """
+        quotas = parse_quotas(MODEL_QUOTAS)
+        endpoints: Dict[str, ModelEndpoint] = {}
+
+        def endpoint(name: str) -> ModelEndpoint:
+            if name not in endpoints:
+                rpm, tpm = quotas.get(name, (0, 0))
+                endpoints[name] = ModelEndpoint(name, self._build_gemini(name), rpm=rpm, tpm=tpm)
+            return endpoints[name]
+
+        def route(name: str) -> List[ModelEndpoint]:
+            names = [name] + ([FALLBACK_MODEL] if FALLBACK_MODEL and FALLBACK_MODEL != name else [])
+            return [endpoint(model) for model in names]
+
+        return ModelRouter({"chat": route(CHAT_MODEL), "summarize": route(CHAT_MODEL), "classify": route(CLASSIFY_MODEL)})
+
+    def _classification_key(self, app_id) -> str:
+        return f"{self.model_name}:{PROMPT_VERSION}:{app_id}"
+
+    def classify_games(self, game_names: List[str], app_ids: Optional[List[int]] = None,
+                       batch_size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                       use_store_metadata: bool = True):
         """
         Uses Gemini to classify a list of games by genre and style.
+        When `app_ids` (parallel to `game_names`) are given, cached classifications are
+        reused, genre and play style are taken from Store API metadata where possible,
+        the LLM is only asked for what is left, and every result carries its `app_id`.
+        Returns {"games": [...], "usage": {prompt_tokens, completion_tokens, requests}}.
         """
-        parser = JsonOutputParser(pydantic_object=GameList)
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a Steam game expert. Classify the following games into Genre, Play Style, and Vibe. Return strict JSON."),
-            ("human", "Classify these games:\n{game_names}\n\n{format_instructions}")
-        ])
+        usage = TokenUsageCallback("classify", self.model_name)
+        with span("ai.classify_games", games=len(game_names)) as attributes:
+            if app_ids is None or self.classification_cache is None:
+                games = self._classify_with_llm(game_names, batch_size, max_concurrency, app_ids=app_ids, usage=usage)
+            else:
+                games = self._classify_cached(game_names, app_ids, use_store_metadata, batch_size,
+                                              max_concurrency, usage, attributes)
+            return self._classification_result(games, usage, attributes)
+
+    async def aclassify_games(self, game_names: List[str], app_ids: Optional[List[int]] = None,
+                              batch_size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                              use_store_metadata: bool = True):
+        """
+        Async version of classify_games: store metadata and LLM batches run on the event loop,
+        SQLite cache access on worker threads. Cancelling it cancels the outstanding requests.
+        """
+        usage = TokenUsageCallback("classify", self.model_name)
+        with span("ai.classify_games", games=len(game_names)) as attributes:
+            if app_ids is None or self.classification_cache is None:
+                games = await self._aclassify_with_llm(game_names, batch_size, max_concurrency,
+                                                       app_ids=app_ids, usage=usage)
+            else:
+                games = await self._aclassify_cached(game_names, app_ids, use_store_metadata, batch_size,
+                                                     max_concurrency, usage, attributes)
+            return self._classification_result(games, usage, attributes)
+
+    @staticmethod
+    def _classification_result(games: List[dict], usage: TokenUsageCallback, attributes: dict) -> dict:
+        totals = usage.totals()
+        attributes["prompt_tokens"] = totals["prompt_tokens"]
+        attributes["completion_tokens"] = totals["completion_tokens"]
+        return {"games": games, "usage": totals}
+
+    def _classify_cached(self, game_names: List[str], app_ids: List[int], use_store_metadata: bool,
+                         batch_size: Optional[int], max_concurrency: Optional[int],
+                         usage: TokenUsageCallback, attributes: dict) -> List[dict]:
+        keys = [self._classification_key(app_id) for app_id in app_ids]
+        games, misses, miss_keys = self._split_cached(game_names, app_ids, keys, self._read_classifications(keys),
+                                                      attributes)
+        if misses:
+            by_key = {key: app_id for app_id, key in miss_keys.items()}
+            fresh = self.classification_flight.do_many(
+                list(by_key),
+                lambda keys: self._classify_and_store(
+                    {by_key[key]: misses[by_key[key]] for key in keys},
+                    miss_keys, use_store_metadata, batch_size, max_concurrency, usage
+                )
+            )
+            games.extend(self._merge_fresh(fresh, by_key, misses))
+        return games
 
-        chain = prompt | self.llm | parser
+    async def _aclassify_cached(self, game_names: List[str], app_ids: List[int], use_store_metadata: bool,
+                                batch_size: Optional[int], max_concurrency: Optional[int],
+                                usage: TokenUsageCallback, attributes: dict) -> List[dict]:
+        keys = [self._classification_key(app_id) for app_id in app_ids]
+        cached = await asyncio.to_thread(self._read_classifications, keys)
+        games, misses, miss_keys = self._split_cached(game_names, app_ids, keys, cached, attributes)
+        if misses:
+            by_key = {key: app_id for app_id, key in miss_keys.items()}
+            fresh = await self.classification_aflight.do_many(
+                list(by_key),
+                lambda keys: self._aclassify_and_store(
+                    {by_key[key]: misses[by_key[key]] for key in keys},
+                    miss_keys, use_store_metadata, batch_size, max_concurrency, usage
+                )
+            )
+            games.extend(self._merge_fresh(fresh, by_key, misses))
+        return games
 
+    def _read_classifications(self, keys: List[str]) -> dict:
         try:
-            games_str = ", ".join(game_names)
-            result = chain.invoke({
-                "game_names": games_str,
-                "format_instructions": parser.get_format_instructions()
-            })
-            return result
+            return self.classification_cache.get_many(keys)
         except Exception as e:
-            print(f"Error classifying games: {e}")
-            return {"games": []}
+            print(f"Error reading classification cache: {e}")
+            return {}
 
-    def get_recommendation(self, user_query: str, library_context: str, language: str = "ko"):
+    def _write_classifications(self, items: Dict[str, dict]):
+        try:
+            self.classification_cache.set_many(items)
+        except Exception as e:
+            print(f"Error writing classification cache: {e}")
+
+    @staticmethod
+    def _split_cached(game_names: List[str], app_ids: List[int], keys: List[str], cached: dict, attributes: dict):
         """
-        Generates a recommendation based on user query and library context.
+        Returns (cached games, misses as app id -> name, misses as app id -> cache key).
+        Misses are keyed by app id, since different apps can share a name.
+        """
+        games = []
+        misses = {}
+        miss_keys = {}
+        for name, app_id, key in zip(game_names, app_ids, keys):
+            if key in cached:
+                # Names can change on the store, so always report the current one
+                games.append({**cached[key], "game_name": name, "app_id": int(app_id)})
+            else:
+                misses[int(app_id)] = name
+                miss_keys[int(app_id)] = key
+
+        attributes["cache_hits"] = len(games)
+        incr("cache_hits_total", len(games), cache="classifications")
+        incr("cache_misses_total", len(misses), cache="classifications")
+        return games, misses, miss_keys
+
+    @staticmethod
+    def _merge_fresh(fresh: dict, by_key: Dict[str, int], misses: Dict[int, str]) -> List[dict]:
+        # A coalesced result may have been requested under another name
+        return [
+            {**item, "game_name": misses[by_key[key]], "app_id": by_key[key]}
+            for key, item in fresh.items()
+            if item is not None
+        ]
+
+    def _classify_and_store(self, misses: Dict[int, str], miss_keys: Dict[int, str], use_store_metadata: bool,
+                            batch_size: Optional[int], max_concurrency: Optional[int],
+                            usage: Optional[TokenUsageCallback] = None) -> Dict[str, dict]:
+        """
+        Classifies the games this caller owns in the single-flight layer and returns them
+        by cache key. Complete results are cached before waiters are released.
+        """
+        items = self._classify_misses(misses, use_store_metadata, batch_size, max_concurrency, usage)
+        results, to_store = self._owned_results(items, misses, miss_keys)
+        self._write_classifications(to_store)
+        return results
+
+    async def _aclassify_and_store(self, misses: Dict[int, str], miss_keys: Dict[int, str], use_store_metadata: bool,
+                                   batch_size: Optional[int], max_concurrency: Optional[int],
+                                   usage: Optional[TokenUsageCallback] = None) -> Dict[str, dict]:
+        items = await self._aclassify_misses(misses, use_store_metadata, batch_size, max_concurrency, usage)
+        results, to_store = self._owned_results(items, misses, miss_keys)
+        await asyncio.to_thread(self._write_classifications, to_store)
+        return results
+
+    def _owned_results(self, items: List[dict], misses: Dict[int, str], miss_keys: Dict[int, str]):
+        """
+        Returns (results by cache key, complete results to cache) for the keys in `miss_keys`.
+        Results without an app id (name-only prompts) go to every owned app with that name.
+        """
+        owned_keys = set(miss_keys.values())
+        keys_by_name = {}
+        for app_id, name in misses.items():
+            keys_by_name.setdefault(name, []).append(miss_keys[app_id])
+
+        results = {}
+        to_store = {}
+        for item in items:
+            if item.get("app_id") is not None:
+                keys = [self._classification_key(item["app_id"])]
+            else:
+                keys = keys_by_name.get(item.get("game_name"), [])
+            for key in keys:
+                if key not in owned_keys or key in results:
+                    continue
+                results[key] = item
+                # Partial results (e.g. a failed vibe lookup) are returned but not cached
+                if all(item.get(field) for field in ("genre", "play_style", "vibe")):
+                    to_store[key] = item
+        return results, to_store
+
+    def _classify_misses(self, misses: Dict[int, str], use_store_metadata: bool,
+                         batch_size: Optional[int], max_concurrency: Optional[int],
+                         usage: Optional[TokenUsageCallback] = None) -> List[dict]:
+        """
+        Classifies uncached games (app id -> name). Games with usable store metadata
+        only need a vibe from the LLM; the rest (e.g. delisted titles) get a full classification.
+        Only store metadata that is already cached is used: the Store API is far slower than
+        the LLM, so missing apps are prefetched in the background and their cached
+        classifications are upgraded once the store data arrives.
+        """
+        store_fields = self._cached_store_fields(misses) if use_store_metadata else {}
+
+        games = []
+        if store_fields:
+            ids = list(store_fields)
+            vibes = self._classify_with_llm([misses[app_id] for app_id in ids], batch_size, max_concurrency,
+                                            vibe_only=True, app_ids=ids, usage=usage)
+            games.extend(self._with_vibes(store_fields, misses, vibes))
+
+        remaining = [app_id for app_id in misses if app_id not in store_fields]
+        if remaining:
+            classified = self._classify_with_llm([misses[app_id] for app_id in remaining], batch_size,
+                                                 max_concurrency, app_ids=remaining, usage=usage)
+            games.extend(self._late_store_fields(classified) if use_store_metadata else classified)
+        return games
+
+    async def _aclassify_misses(self, misses: Dict[int, str], use_store_metadata: bool,
+                                batch_size: Optional[int], max_concurrency: Optional[int],
+                                usage: Optional[TokenUsageCallback] = None) -> List[dict]:
+        store_fields = await asyncio.to_thread(self._cached_store_fields, misses) if use_store_metadata else {}
+
+        # Vibes for store-classified games and full classifications for the rest run concurrently
+        ids = list(store_fields)
+        remaining = [app_id for app_id in misses if app_id not in store_fields]
+        vibes, classified = await asyncio.gather(
+            self._aclassify_with_llm([misses[app_id] for app_id in ids], batch_size, max_concurrency,
+                                     vibe_only=True, app_ids=ids, usage=usage),
+            self._aclassify_with_llm([misses[app_id] for app_id in remaining], batch_size, max_concurrency,
+                                     app_ids=remaining, usage=usage)
+        )
+        if use_store_metadata and classified:
+            classified = await asyncio.to_thread(self._late_store_fields, classified)
+        return self._with_vibes(store_fields, misses, vibes) + classified
+
+    def _cached_store_fields(self, misses: Dict[int, str]) -> Dict[int, dict]:
+        """
+        Genre and play style from cached store metadata, by app id. Apps without a fresh cache
+        entry are queued for a background prefetch, which upgrades their cached classifications.
+        """
+        try:
+            details_by_id, to_fetch = cached_game_details(misses)
+            prefetch_game_details(to_fetch, on_fetched=self._upgrade_classifications)
+        except Exception as e:
+            print(f"Error loading store metadata: {e}")
+            return {}
+        return self._store_fields(details_by_id)
+
+    @staticmethod
+    def _store_fields(details_by_id: Dict[int, Optional[dict]]) -> Dict[int, dict]:
+        store_fields = {}
+        for app_id, details in details_by_id.items():
+            fields = classify_from_store(details)
+            if fields:
+                store_fields[app_id] = fields
+        return store_fields
+
+    def _late_store_fields(self, games: List[dict]) -> List[dict]:
+        """
+        Store metadata prefetched while the LLM was running replaces its genre and play style.
+        """
+        ids = [game["app_id"] for game in games if game.get("app_id") is not None]
+        if not ids:
+            return games
+        try:
+            details_by_id, _ = cached_game_details(ids)
+        except Exception as e:
+            print(f"Error loading store metadata: {e}")
+            return games
+
+        store_fields = self._store_fields(details_by_id)
+        return [{**game, **store_fields[game["app_id"]]} if game.get("app_id") in store_fields else game
+                for game in games]
+
+    def _upgrade_classifications(self, details_by_id: Dict[int, dict]):
+        """
+        Called by the store prefetch: cached LLM classifications of these apps take the
+        store-derived genre and play style and keep their vibe, so the next visit sees
+        the same labels as if the store data had been there from the start.
+        """
+        if self.classification_cache is None:
+            return
+        store_fields = self._store_fields(details_by_id)
+        keys = {self._classification_key(app_id): app_id for app_id in store_fields}
+        upgraded = {}
+        for key, item in self._read_classifications(list(keys)).items():
+            fields = store_fields[keys[key]]
+            if any(item.get(field) != value for field, value in fields.items()):
+                upgraded[key] = {**item, **fields}
+        self._write_classifications(upgraded)
+        incr("classifications_upgraded_total", len(upgraded))
+
+    @staticmethod
+    def _with_vibes(store_fields: Dict[int, dict], misses: Dict[int, str], vibes: List[dict]) -> List[dict]:
+        # Compact answers carry app ids; name-only ones are matched by name
+        by_id = {item["app_id"]: item.get("vibe") for item in vibes if item.get("app_id") is not None}
+        by_name = {item.get("game_name"): item.get("vibe") for item in vibes}
+        games = []
+        for app_id, fields in store_fields.items():
+            item = {"game_name": misses[app_id], "app_id": app_id, **fields}
+            vibe = by_id.get(app_id) or by_name.get(misses[app_id])
+            if vibe:
+                item["vibe"] = vibe
+            games.append(item)
+        return games
+
+    def _classification_chain(self, llm, vibe_only: bool, compact: bool):
+        """
+        Returns (chain, format_instructions) for one classification request.
+        Compact chains take "app_id|name" lines and bind the schema through the model's
+        native structured output; models without it get the schema as prose instructions.
+        """
+        if compact:
+            schema = CompactVibeList if vibe_only else CompactGameList
+            header = "Describe these games (app_id|name):" if vibe_only else "Classify these games (app_id|name):"
+        else:
+            schema = GameVibeList if vibe_only else GameList
+            header = "Describe these games:" if vibe_only else "Classify these games:"
+        task = "Describe the Vibe of each of the following games." if vibe_only else \
+            "Classify the following games into Genre, Play Style, and Vibe."
+
+        model = None
+        if compact:
+            try:
+                model = llm.with_structured_output(schema)
+            except NotImplementedError:
+                model = None
+
+        if model is not None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", f"You are a Steam game expert. {task} Answer once per app_id."),
+                ("human", header + "\n{game_names}")
+            ])
+            return prompt | model, ""
+
+        parser = JsonOutputParser(pydantic_object=schema)
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", f"You are a Steam game expert. {task} Return strict JSON."),
+            ("human", header + "\n{game_names}\n\n{format_instructions}")
+        ])
+        return prompt | llm | parser, parser.get_format_instructions()
+
+    def _classify_with_llm(self, game_names: List[str], batch_size: Optional[int] = None,
+                           max_concurrency: Optional[int] = None, vibe_only: bool = False,
+                           app_ids: Optional[List[int]] = None,
+                           usage: Optional[TokenUsageCallback] = None) -> List[dict]:
+        """
+        Splits the names into size-bounded chunks and classifies them concurrently.
+        Failed chunks are retried, then bisected, so one bad batch only loses itself.
+        With `vibe_only`, the model is only asked for each game's vibe. With `app_ids`,
+        games are sent compactly and results are matched back by app id, not by name.
+        """
+        compact, max_concurrency, pending = self._llm_work(game_names, batch_size, max_concurrency, app_ids)
+        chains = {}
+        games = []
+        while pending:
+            # Re-routed every round, so retries can move to the fallback model. A round only
+            # sends as many chunks as the model's quota allows; the rest wait for the next one.
+            endpoint, granted = self.router.select_batch("classify", len(pending))
+            batch, pending = pending[:granted], pending[granted:]
+            inputs, config = self._llm_round(endpoint, chains, batch, vibe_only, compact, max_concurrency, usage)
+            results = chains[endpoint.name][0].batch(inputs, config=config, return_exceptions=True)
+            pending += self._collect_round(batch, results, compact, games)
+        return games
+
+    async def _aclassify_with_llm(self, game_names: List[str], batch_size: Optional[int] = None,
+                                  max_concurrency: Optional[int] = None, vibe_only: bool = False,
+                                  app_ids: Optional[List[int]] = None,
+                                  usage: Optional[TokenUsageCallback] = None) -> List[dict]:
+        compact, max_concurrency, pending = self._llm_work(game_names, batch_size, max_concurrency, app_ids)
+        chains = {}
+        games = []
+        while pending:
+            # select_batch() may wait for quota, which must not block the event loop
+            endpoint, granted = await asyncio.to_thread(self.router.select_batch, "classify", len(pending))
+            batch, pending = pending[:granted], pending[granted:]
+            inputs, config = self._llm_round(endpoint, chains, batch, vibe_only, compact, max_concurrency, usage)
+            results = await chains[endpoint.name][0].abatch(inputs, config=config, return_exceptions=True)
+            pending += self._collect_round(batch, results, compact, games)
+        return games
+
+    @staticmethod
+    def _llm_work(game_names: List[str], batch_size: Optional[int], max_concurrency: Optional[int],
+                  app_ids: Optional[List[int]]):
+        """
+        Returns (compact, max_concurrency, pending chunks) for a classification run.
+        """
+        compact = app_ids is not None and CLASSIFY_COMPACT
+        batch_size = max(1, batch_size or CLASSIFY_BATCH_SIZE)
+        max_concurrency = max(1, max_concurrency or CLASSIFY_MAX_CONCURRENCY)
+
+        # Work items are (app id or None, name)
+        items = list(zip(app_ids if compact else [None] * len(game_names), game_names))
+        # Each pending entry is (chunk, attempts already made at this chunk size)
+        pending = [(items[i:i + batch_size], 0) for i in range(0, len(items), batch_size)]
+        return compact, max_concurrency, pending
+
+    def _llm_round(self, endpoint: ModelEndpoint, chains: dict, pending: list, vibe_only: bool, compact: bool,
+                   max_concurrency: int, usage: Optional[TokenUsageCallback]):
         """
+        Builds (or reuses) the chain for `endpoint` and returns the batch inputs and config for one round.
+        """
+        if endpoint.name not in chains:
+            chains[endpoint.name] = self._classification_chain(endpoint.llm, vibe_only, compact)
+        format_instructions = chains[endpoint.name][1]
+        inputs = [{"game_names": self._format_chunk(chunk, compact), "format_instructions": format_instructions}
+                  for chunk, _ in pending]
+        config = {
+            "max_concurrency": max_concurrency,
+            "callbacks": [usage or TokenUsageCallback("classify", self.model_name), endpoint.callback_for("classify")]
+        }
+        return inputs, config
+
+    def _collect_round(self, pending: list, results: list, compact: bool, games: List[dict]) -> list:
+        """
+        Adds the well-formed results to `games` and returns the chunks to retry, including
+        the games a model silently left out of an otherwise valid answer.
+        """
+        retry = []
+        for (chunk, attempts), result in zip(pending, results):
+            if isinstance(result, BaseModel):
+                result = result.model_dump()
+            if isinstance(result, dict) and isinstance(result.get("games"), list):
+                matched = self._match_chunk(chunk, result["games"], compact)
+                games.extend(matched)
+                missing = self._missing_from_chunk(chunk, matched, compact)
+                if missing:
+                    print(f"Model skipped {len(missing)} of {len(chunk)} games (attempt {attempts + 1})")
+                    incr("llm_missing_games_total", len(missing), purpose="classify")
+                    self._requeue(missing, attempts, retry)
+                continue
+
+            print(f"Error classifying games (chunk of {len(chunk)}, attempt {attempts + 1}): {result}")
+            incr("llm_chunk_failures_total", purpose="classify")
+            self._requeue(chunk, attempts, retry)
+        return retry
+
+    @staticmethod
+    def _requeue(chunk: list, attempts: int, retry: list):
+        # Retry at the same size first, then bisect, so one bad game only loses itself
+        if attempts < CLASSIFY_MAX_RETRIES:
+            retry.append((chunk, attempts + 1))
+        elif len(chunk) > 1:
+            middle = len(chunk) // 2
+            retry.append((chunk[:middle], 0))
+            retry.append((chunk[middle:], 0))
+        else:
+            print(f"Giving up on classifying: {chunk[0][1]}")
+
+    @staticmethod
+    def _missing_from_chunk(chunk: list, matched: List[dict], compact: bool) -> list:
+        """
+        Chunk items without a result. Name-only chunks are matched by name, and only checked
+        when the model answered fewer games than asked, since it may have reworded a title.
+        """
+        if compact:
+            answered = {item["app_id"] for item in matched}
+            return [(app_id, name) for app_id, name in chunk if int(app_id) not in answered]
+        if len(matched) >= len(chunk):
+            return []
+        answered = {item.get("game_name") for item in matched}
+        return [(app_id, name) for app_id, name in chunk if name not in answered]
+
+    @staticmethod
+    def _format_chunk(chunk, compact: bool) -> str:
+        if compact:
+            # One game per line, so commas (or pipes) inside names stay unambiguous
+            return "\n".join(f"{app_id}|{' '.join(str(name).split())}" for app_id, name in chunk)
+        return ", ".join(name for _, name in chunk)
+
+    @staticmethod
+    def _match_chunk(chunk, results: list, compact: bool) -> List[dict]:
+        """
+        Keeps well-formed results. Compact results are matched back by app id and given the
+        library's own name, so a model rewriting a title no longer loses the row.
+        """
+        results = [item for item in results if isinstance(item, dict)]
+        if not compact:
+            return results
+
+        names_by_id = {int(app_id): name for app_id, name in chunk}
+        matched = []
+        for item in results:
+            try:
+                app_id = int(item.get("app_id"))
+            except (TypeError, ValueError):
+                continue
+            if app_id in names_by_id:
+                matched.append({**item, "app_id": app_id, "game_name": names_by_id.pop(app_id)})
+        return matched
+
+    def _recommendation_prompt(self, language: str):
         lang_instruction = "Answer in Korean." if language == "ko" else "Answer in English."
         
         prompt = ChatPromptTemplate.from_messages([
             ("system", "You are a helpful Steam library assistant. You have access to the user's game library stats and classifications."),
             ("system", f"Context about user's library: {{library_context}}\n\nIMPORTANT: {lang_instruction}"),
+            ("system", "Summary of the earlier conversation: {conversation_summary}"),
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{question}")
         ])
 
-        chain = prompt | self.llm
-        
-        # Load history
-        history = self.memory.load_memory_variables({})["chat_history"]
-        
-        response = chain.invoke({
+        return prompt
+
+    @property
+    def memory(self) -> SimpleMemory:
+        return self.sessions.get(DEFAULT_SESSION)
+
+    def _summarize_history(self, summary: str, messages: list) -> str:
+        transcript = "\n".join(
+            f"{'User' if message.type == 'human' else 'Assistant'}: {message.content}" for message in messages
+        )
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "Condense the conversation into a short summary (under 120 words) that keeps the user's preferences and games already recommended."),
+            ("human", "Current summary:\n{summary}\n\nNew messages:\n{transcript}")
+        ])
+        response = self.router.invoke("summarize", lambda llm, callbacks: (prompt | llm).invoke(
+            {"summary": summary or "(none)", "transcript": transcript},
+            config={"callbacks": [TokenUsageCallback("summarize", self.router.primary("summarize").name), *callbacks]}
+        ))
+        return response.content
+
+    def _response_key(self, user_query: str, library_context: str, language: str, memory: SimpleMemory) -> Optional[str]:
+        """
+        Cache key for a first-turn answer, or None once the conversation has history.
+        The library context is part of the key, so a changed library never sees old answers.
+        """
+        if self.response_cache is None or memory.chat_history or memory.summary:
+            return None
+        digest = hashlib.sha256()
+        for part in (self.router.primary("chat").name, CHAT_PROMPT_VERSION, language, normalize_query(user_query), library_context):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cached_response(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            cached = self.response_cache.get(key)
+        except Exception as e:
+            print(f"Error reading response cache: {e}")
+            cached = None
+        incr("cache_hits_total" if cached is not None else "cache_misses_total", cache="responses")
+        return cached
+
+    def _store_response(self, key: Optional[str], text: str):
+        if key is None or not text:
+            return
+        try:
+            self.response_cache.set(key, text)
+        except Exception as e:
+            print(f"Error writing response cache: {e}")
+
+    def _chat_request(self, user_query: str, library_context: str, language: str, memory: SimpleMemory):
+        """
+        Returns (prompt, inputs, usage callback) for one chat turn.
+        """
+        variables = memory.load_memory_variables({})
+        inputs = {
             "library_context": library_context,
-            "chat_history": history,
+            "chat_history": variables["chat_history"],
+            "conversation_summary": variables["conversation_summary"],
             "question": user_query
-        })
+        }
+        usage = TokenUsageCallback("chat", self.router.primary("chat").name)
+        return self._recommendation_prompt(language), inputs, usage
+
+    def get_recommendation(self, user_query: str, library_context: str, language: str = "ko",
+                           session_id: Optional[str] = None):
+        """
+        Generates a recommendation based on user query and library context.
+        Repeated first-turn questions against the same library are answered from the response cache.
+        """
+        memory = self.sessions.get(session_id or DEFAULT_SESSION)
+        
+        key = self._response_key(user_query, library_context, language, memory)
+        cached = self._cached_response(key)
+        if cached is not None:
+            memory.save_context({"question": user_query}, {"output": cached})
+            return cached
+
+        prompt, inputs, usage = self._chat_request(user_query, library_context, language, memory)
+        with span("ai.get_recommendation"):
+            response = self.router.invoke("chat", lambda llm, callbacks: (prompt | llm).invoke(
+                inputs, config={"callbacks": [usage, *callbacks]}
+            ))
         
         # Save context
-        self.memory.save_context({"question": user_query}, {"output": response.content})
+        memory.save_context({"question": user_query}, {"output": response.content})
+        self._store_response(key, response.content)
         
         return response.content
+
+    async def aget_recommendation(self, user_query: str, library_context: str, language: str = "ko",
+                                  session_id: Optional[str] = None):
+        """
+        Async version of get_recommendation. Memory updates (which may summarize with the LLM)
+        and response cache access run on worker threads.
+        """
+        memory = self.sessions.get(session_id or DEFAULT_SESSION)
+
+        key = self._response_key(user_query, library_context, language, memory)
+        cached = await asyncio.to_thread(self._cached_response, key)
+        if cached is not None:
+            await asyncio.to_thread(memory.save_context, {"question": user_query}, {"output": cached})
+            return cached
+
+        prompt, inputs, usage = self._chat_request(user_query, library_context, language, memory)
+        with span("ai.get_recommendation"):
+            response = await self.router.ainvoke("chat", lambda llm, callbacks: (prompt | llm).ainvoke(
+                inputs, config={"callbacks": [usage, *callbacks]}
+            ))
+
+        await asyncio.to_thread(memory.save_context, {"question": user_query}, {"output": response.content})
+        await asyncio.to_thread(self._store_response, key, response.content)
+        return response.content
+
+    def stream_recommendation(self, user_query: str, library_context: str, language: str = "ko",
+                              session_id: Optional[str] = None):
+        """
+        Streaming variant of get_recommendation: yields text chunks as they are generated
+        and saves the assembled answer to memory once the stream completes.
+        """
+        memory = self.sessions.get(session_id or DEFAULT_SESSION)
+
+        key = self._response_key(user_query, library_context, language, memory)
+        cached = self._cached_response(key)
+        if cached is not None:
+            memory.save_context({"question": user_query}, {"output": cached})
+            yield cached
+            return
+
+        prompt, inputs, usage = self._chat_request(user_query, library_context, language, memory)
+
+        parts = []
+        with span("ai.stream_recommendation") as attributes:
+            start = time.perf_counter()
+            for chunk in self.router.stream("chat", lambda llm, callbacks: (prompt | llm).stream(
+                inputs, config={"callbacks": [usage, *callbacks]}
+            )):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                if text:
+                    if not parts:
+                        attributes["first_token_s"] = round(time.perf_counter() - start, 6)
+                    parts.append(text)
+                    yield text
+
+        answer = "".join(parts)
+        memory.save_context({"question": user_query}, {"output": answer})
+        self._store_response(key, answer)
+
+    async def astream_recommendation(self, user_query: str, library_context: str, language: str = "ko",
+                                     session_id: Optional[str] = None):
+        """
+        Async version of stream_recommendation. If the consumer stops early (e.g. the client
+        disconnects), the model request is cancelled and nothing is saved.
+        """
+        memory = self.sessions.get(session_id or DEFAULT_SESSION)
+
+        key = self._response_key(user_query, library_context, language, memory)
+        cached = await asyncio.to_thread(self._cached_response, key)
+        if cached is not None:
+            await asyncio.to_thread(memory.save_context, {"question": user_query}, {"output": cached})
+            yield cached
+            return
+
+        prompt, inputs, usage = self._chat_request(user_query, library_context, language, memory)
+
+        parts = []
+        with span("ai.stream_recommendation") as attributes:
+            start = time.perf_counter()
+            chunks = self.router.astream("chat", lambda llm, callbacks: (prompt | llm).astream(
+                inputs, config={"callbacks": [usage, *callbacks]}
+            ))
+            try:
+                async for chunk in chunks:
+                    text = chunk.content if isinstance(chunk.content, str) else ""
+                    if text:
+                        if not parts:
+                            attributes["first_token_s"] = round(time.perf_counter() - start, 6)
+                        parts.append(text)
+                        yield text
+            finally:
+                await chunks.aclose()
+
+        answer = "".join(parts)
+        await asyncio.to_thread(memory.save_context, {"question": user_query}, {"output": answer})
+        await asyncio.to_thread(self._store_response, key, answer)
@@ -1,10 +1,13 @@
 import streamlit as st
-import pandas as pd
 import os
-import plotly.express as px
+import re
+import time
+import uuid
+from datetime import datetime
 from dotenv import load_dotenv
 from steam_api import get_owned_games
-from ai_recommender import AIRecommender
+from library_context import LibraryIndex, build_library_context
+from metrics import metrics, span, timed_import
 import translations as t
 
 # Load environment variables
@@ -17,6 +20,9 @@ if "language" not in st.session_state:
     st.session_state["language"] = "ko"
 if "theme" not in st.session_state:
     st.session_state["theme"] = "dark"
+# Keys this browser session's chat memory inside the shared AIRecommender
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
 
 # Helper for getting text
 def get_text(key_dict):
@@ -73,19 +79,161 @@ if st.session_state["theme"] == "light":
     </style>
     """, unsafe_allow_html=True)
 
+# How often the dashboard checks a running background classification for finished chunks
+CLASSIFY_POLL_SECONDS = float(os.getenv("CLASSIFY_POLL_SECONDS", "1.0"))
+
+# Distinct (library, title) pairs whose stats and chart stay cached across reruns and sessions
+DASHBOARD_CACHE_ENTRIES = int(os.getenv("DASHBOARD_CACHE_ENTRIES", "64"))
+
+# Group mode: games classified per group (most widely owned first) and rows shown in the ranking
+GROUP_CLASSIFY_LIMIT = int(os.getenv("GROUP_CLASSIFY_LIMIT", "300"))
+GROUP_RANK_LIMIT = int(os.getenv("GROUP_RANK_LIMIT", "30"))
+
 # Initialize AI Recommender (lazy load)
 @st.cache_resource
 def get_ai_recommender(api_key):
     try:
         os.environ["GOOGLE_API_KEY"] = api_key
-        return AIRecommender()
+        # LangChain/Gemini load here, on first use, rather than at process start
+        return timed_import("ai_recommender").AIRecommender()
     except Exception as e:
         print(f"AI Init Error: {e}")
         return None
 
+# Saved libraries per Steam ID, shared by every session on this server
+@st.cache_resource
+def get_snapshot_store():
+    try:
+        return timed_import("snapshots").LibrarySnapshotStore()
+    except Exception as e:
+        print(f"Snapshot store unavailable: {e}")
+        return None
+
+def apply_finished_chunks(df, job):
+    """
+    Writes the chunks the background job has finished since the last rerun into the library.
+    """
+    library = timed_import("library")
+    for positions, games, error in job.drain():
+        if games is None:
+            st.warning(f"AI Classification partial failure: {error}")
+            library.set_labels_at(df, positions, "Unknown")
+        else:
+            library.apply_classifications_at(df, positions, games)
+        # Readers (e.g. the chat index) key on this to notice new labels
+        st.session_state["labels_version"] = st.session_state.get("labels_version", 0) + 1
+
+def library_fingerprint(df):
+    """
+    Content hash of the library, recomputed only when the table or its labels change.
+    """
+    version = (id(df), st.session_state.get("labels_version", 0))
+    if st.session_state.get("library_fingerprint_version") != version:
+        st.session_state["library_fingerprint"] = timed_import("library").library_fingerprint(df)
+        st.session_state["library_fingerprint_version"] = version
+    return st.session_state["library_fingerprint"]
+
+# The DataFrame argument is skipped by Streamlit's hashing; the fingerprint stands in for it
+@st.cache_data(max_entries=DASHBOARD_CACHE_ENTRIES, show_spinner=False)
+def cached_library_stats(fingerprint, _df):
+    return timed_import("library").library_stats(_df)
+
+@st.cache_data(max_entries=DASHBOARD_CACHE_ENTRIES, show_spinner=False)
+def cached_genre_chart(fingerprint, title, _df):
+    with span("app.genre_chart"):
+        return timed_import("library").genre_chart(_df, title)
+
+def parse_steam_ids(text):
+    return list(dict.fromkeys(part for part in re.split(r"[\s,]+", text or "") if part))
+
+def render_group_view(steam_ids, ai):
+    """
+    Group mode: fetches every member's library at once and ranks the games the group shares.
+    """
+    library = timed_import("library")
+    group_library = timed_import("group_library")
+    background = timed_import("background")
+
+    group_key = tuple(steam_ids)
+    if st.session_state.get("group_key") != group_key:
+        with st.spinner(get_text(t.LOADING_MSG)):
+            libraries = group_library.fetch_libraries(steam_ids)
+            group = group_library.GroupLibrary(libraries, label="Unclassified" if ai else "Unknown")
+        st.session_state["group"] = group
+        st.session_state["group_failed"] = [steam_id for steam_id, games in libraries.items() if not games]
+        st.session_state["group_key"] = group_key
+        st.session_state.pop("group_classification_job", None)
+
+        # Each shared appid is classified once for the whole group, most widely owned first
+        if ai and group.members:
+            rows = group.shared_rows(min(2, len(group.members)))[:GROUP_CLASSIFY_LIMIT]
+            if len(rows):
+                library.set_labels_at(group.df, rows, "Pending")
+                job = background.start_classification(ai, group.df, rows)
+                if job is not None:
+                    st.session_state["group_classification_job"] = job
+
+    group = st.session_state["group"]
+    if st.session_state["group_failed"]:
+        st.warning(get_text(t.GROUP_FAILED_IDS).format(", ".join(st.session_state["group_failed"])))
+    if not group.members:
+        st.warning(get_text(t.NO_GAMES_FOUND))
+        return
+
+    member_count = len(group.members)
+    st.subheader(get_text(t.GROUP_HEADER))
+    c1, c2, c3 = st.columns(3)
+    c1.metric(get_text(t.GROUP_MEMBERS), member_count)
+    c2.metric(get_text(t.GROUP_UNIQUE_GAMES), len(group.df))
+    c3.metric(get_text(t.GROUP_SHARED_BY_ALL), len(group.shared_rows(member_count)))
+
+    polling = CLASSIFY_POLL_SECONDS if "group_classification_job" in st.session_state else None
+
+    @st.fragment(run_every=polling)
+    def render_group_ranking():
+        job = st.session_state.get("group_classification_job")
+        if job is not None:
+            apply_finished_chunks(group.df, job)
+            if job.done:
+                del st.session_state["group_classification_job"]
+                st.rerun()
+            st.progress(job.progress, text=f"{get_text(t.AI_ANALYZING).format(job.total)} ({job.completed}/{job.total})")
+
+        col_owners, col_hours, col_multi = st.columns([3, 2, 2], vertical_alignment="bottom")
+        min_owners = member_count
+        if member_count > 1:
+            with col_owners:
+                min_owners = st.slider(get_text(t.GROUP_MIN_OWNERS), 1, member_count, member_count)
+        with col_hours:
+            max_hours = st.number_input(get_text(t.GROUP_MAX_HOURS), min_value=0.0, value=0.0, step=5.0)
+        with col_multi:
+            multiplayer_only = st.checkbox(get_text(t.GROUP_MULTIPLAYER_ONLY), value=True)
+
+        ranked = group.rank(min_owners, multiplayer_only, max_hours or None, limit=GROUP_RANK_LIMIT)
+        st.dataframe(
+            ranked[["name", "owners", "playtime_hours", "Genre", "Style", "Vibe", "missing"]],
+            column_config={
+                "name": get_text(t.COL_GAME),
+                "owners": st.column_config.NumberColumn(get_text(t.COL_OWNERS)),
+                "playtime_hours": st.column_config.NumberColumn(get_text(t.COL_HOURS), format="%.1f h"),
+                "Genre": st.column_config.TextColumn(get_text(t.COL_GENRE)),
+                "Style": st.column_config.TextColumn(get_text(t.COL_STYLE)),
+                "Vibe": st.column_config.TextColumn(get_text(t.COL_VIBE)),
+                "missing": st.column_config.TextColumn(get_text(t.COL_MISSING)),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+    render_group_ranking()
+
 # Sidebar Content
 env_steam_id = os.getenv("STEAM_ID", "")
 steam_id_input = st.sidebar.text_input("Steam ID", value=env_steam_id)
+group_mode = st.sidebar.toggle(get_text(t.GROUP_MODE_TOGGLE))
+group_ids = []
+if group_mode:
+    group_ids = parse_steam_ids(st.sidebar.text_area(get_text(t.GROUP_IDS_INPUT), value=steam_id_input))
 
 env_steam_key = os.getenv("STEAM_API_KEY")
 env_gemini_key = os.getenv("GEMINI_API_KEY")
@@ -104,6 +252,7 @@ else:
     gemini_api_key = st.sidebar.text_input(get_text(t.INPUT_GEMINI_KEY), type="password")
 
 refresh_btn = st.sidebar.button(get_text(t.REFRESH_BTN))
+show_perf_panel = st.sidebar.toggle(get_text(t.PERF_PANEL_TOGGLE), value=os.getenv("SHOW_PERF_PANEL") == "1")
 
 # Main UI
 st.title(get_text(t.TITLE))
@@ -113,20 +262,57 @@ st.markdown(get_text(t.SUBTITLE))
 if refresh_btn:
     if "games_data" in st.session_state:
         del st.session_state["games_data"]
+    # A job still running against the old table is left to finish on its own
+    st.session_state.pop("classification_job", None)
+    # Skip the saved snapshot and diff a fresh GetOwnedGames against it
+    st.session_state["force_refresh"] = True
+    st.session_state.pop("group_key", None)
     st.rerun()
 
 # Main Logic
-if steam_id_input and steam_api_key:
+if group_mode and group_ids and steam_api_key:
     os.environ["STEAM_API_KEY"] = steam_api_key
+    render_group_view(group_ids, get_ai_recommender(gemini_api_key) if gemini_api_key else None)
+
+elif steam_id_input and steam_api_key and not group_mode:
+    os.environ["STEAM_API_KEY"] = steam_api_key
+    # pandas (and Plotly, on first chart) load only once there is a library to show
+    library = timed_import("library")
     
     ai = None
     if gemini_api_key:
         ai = get_ai_recommender(gemini_api_key)
 
+    # A different Steam ID is a different library
+    if st.session_state.get("games_steam_id") != steam_id_input:
+        st.session_state.pop("games_data", None)
+        st.session_state.pop("classification_job", None)
+
     if "games_data" not in st.session_state:
         with st.spinner(get_text(t.LOADING_MSG)):
             try:
-                raw_games = get_owned_games(steam_id_input)
+                snapshots = timed_import("snapshots")
+                store = get_snapshot_store()
+                snapshot = store.load(steam_id_input) if store else None
+                force_refresh = st.session_state.pop("force_refresh", False)
+                st.session_state["library_delta"] = None
+                st.session_state["snapshot_taken_at"] = None
+
+                if snapshot and not force_refresh and time.time() - snapshot["taken_at"] < snapshots.SNAPSHOT_MAX_AGE:
+                    raw_games = snapshot["games"]
+                    st.session_state["snapshot_taken_at"] = snapshot["taken_at"]
+                else:
+                    raw_games = get_owned_games(steam_id_input)
+                    if raw_games is None and snapshot:
+                        # Steam is unreachable: show the saved library rather than nothing
+                        raw_games = snapshot["games"]
+                        st.session_state["snapshot_taken_at"] = snapshot["taken_at"]
+                    elif raw_games and store:
+                        if snapshot:
+                            st.session_state["library_delta"] = snapshots.diff_games(snapshot["games"], raw_games)
+                        owned = {int(game["appid"]) for game in raw_games}
+                        labels = {app_id: value for app_id, value in (snapshot or {}).get("labels", {}).items() if app_id in owned}
+                        store.save(steam_id_input, raw_games, labels)
                 
                 if raw_games is None:
                     st.error(get_text(t.NO_API_KEY_STEAM))
@@ -136,50 +322,19 @@ if steam_id_input and steam_api_key:
                     st.warning(get_text(t.NO_GAMES_FOUND))
                     st.stop()
                 
-                df_raw = pd.DataFrame(raw_games)
-                
-                if "playtime_forever" in df_raw.columns:
-                    df_raw["playtime_hours"] = (df_raw["playtime_forever"] / 60).round(1)
-                else:
-                    df_raw["playtime_hours"] = 0.0
-                    
-                df_raw = df_raw.sort_values(by="playtime_forever", ascending=False)
-                
-                if "img_icon_url" in df_raw.columns:
-                    df_raw["icon_url"] = df_raw.apply(
-                        lambda x: f"http://media.steampowered.com/steamcommunity/public/images/apps/{x['appid']}/{x['img_icon_url']}.jpg", axis=1
-                    )
-                else:
-                    df_raw["icon_url"] = ""
-
                 if "ai_limit" not in st.session_state:
                     st.session_state["ai_limit"] = 50
 
-                games_to_classify = df_raw.head(st.session_state["ai_limit"])
-                game_names = games_to_classify["name"].tolist() if "name" in games_to_classify.columns else []
-                
-                if ai and game_names:
-                    with st.spinner(get_text(t.AI_ANALYZING).format(len(game_names))):
-                        try:
-                            classification_res = ai.classify_games(game_names)
-                            classified_list = classification_res.get("games", [])
-                            genre_map = {item["game_name"]: item for item in classified_list}
-                            
-                            def get_ai_metadata(game_name, field):
-                                return genre_map.get(game_name, {}).get(field, "Unclassified")
-                                
-                            df_raw["Genre"] = df_raw["name"].apply(lambda x: get_ai_metadata(x, "genre"))
-                            df_raw["Style"] = df_raw["name"].apply(lambda x: get_ai_metadata(x, "play_style"))
-                            df_raw["Vibe"] = df_raw["name"].apply(lambda x: get_ai_metadata(x, "vibe"))
-                        except Exception as e:
-                            st.warning(f"AI Classification partial failure: {e}")
-                            df_raw["Genre"] = "Unknown"
-                            df_raw["Style"] = "Unknown"
-                            df_raw["Vibe"] = "Unknown"
-                else:
-                    df_raw["Genre"] = "Unknown"
-                    df_raw["Style"] = "Unknown"
-                    df_raw["Vibe"] = "Unknown"
+                # Rows past the classified head keep this label until the limit expands
+                with span("app.build_library", games=len(raw_games)):
+                    df_raw = library.build_library(raw_games, label="Unclassified" if ai else "Unknown")
+                    # Games classified before keep their labels; only new ones go to the LLM
+                    if snapshot:
+                        library.restore_labels(df_raw, snapshot["labels"])
+                st.session_state["classified_limit"] = 0
+                st.session_state.pop("classification_job", None)
+                st.session_state["games_steam_id"] = steam_id_input
+                st.session_state["labels_version"] = st.session_state.get("labels_version", 0) + 1
                 
                 st.session_state["games_data"] = df_raw
 
@@ -189,110 +344,203 @@ if steam_id_input and steam_api_key:
 
     if "games_data" in st.session_state:
         df = st.session_state["games_data"]
+
+        # Classify only the rows added since the last expansion of ai_limit, in the background.
+        # One job per session at a time; a wider limit is picked up once the current job finishes.
+        background = timed_import("background")
+        classified_limit = st.session_state.get("classified_limit", 0)
+        target_limit = min(st.session_state["ai_limit"], len(df))
+        if ai and classified_limit < target_limit and "classification_job" not in st.session_state:
+            rows = library.unlabeled_rows(df, classified_limit, target_limit)
+            if len(rows):
+                library.set_labels_at(df, rows, "Pending")
+                st.session_state["labels_version"] = st.session_state.get("labels_version", 0) + 1
+                job = background.start_classification(ai, df, rows)
+                if job is not None:
+                    st.session_state["classification_job"] = job
+            st.session_state["classified_limit"] = target_limit
         
         # 1. Statistics
-        st.subheader(f"📊 {get_text(t.STATS_TOTAL_GAMES)}: {len(df)}")
+        stats = cached_library_stats(library_fingerprint(df), df)
+        st.subheader(f"📊 {get_text(t.STATS_TOTAL_GAMES)}: {stats['games']}")
         # No, let's keep original 3-column layout
         # st.subheader("📊 Library Stats")
         c1, c2, c3 = st.columns(3)
-        c1.metric(get_text(t.STATS_TOTAL_GAMES), len(df))
-        c2.metric(get_text(t.STATS_PLAYTIME), f"{int(df['playtime_hours'].sum())} hrs")
-        most_played = df.iloc[0]['name'] if not df.empty else "N/A"
-        c3.metric(get_text(t.STATS_MOST_PLAYED), most_played)
-        
-        # 2. Charts
-        if "Genre" in df.columns and not df.empty:
-            st.subheader(get_text(t.CHART_TITLE))
+        c1.metric(get_text(t.STATS_TOTAL_GAMES), stats["games"])
+        c2.metric(get_text(t.STATS_PLAYTIME), f"{stats['hours']} hrs")
+        c3.metric(get_text(t.STATS_MOST_PLAYED), stats["most_played"])
+
+        # What changed since the saved snapshot, and recent play, without extra API calls
+        store = get_snapshot_store()
+        delta = st.session_state.get("library_delta")
+        if st.session_state.get("snapshot_taken_at"):
+            taken_at = datetime.fromtimestamp(st.session_state["snapshot_taken_at"]).strftime("%Y-%m-%d %H:%M")
+            st.caption(get_text(t.SNAPSHOT_LOADED).format(taken_at))
+        elif delta and (delta["new"] or delta["removed"] or delta["playtime"]):
+            played = sum(delta["playtime"].values()) / 60
+            st.info(get_text(t.LIBRARY_DELTA).format(len(delta["new"]), len(delta["removed"]), played))
+
+        recent_games = []
+        if store:
+            recent = store.playtime_since(steam_id_input, time.time() - 7 * 86400)
+            names = dict(zip(df["appid"].astype(int), df["name"]))
+            recent_games = [
+                (names[app_id], minutes / 60)
+                for app_id, minutes in sorted(recent.items(), key=lambda item: -item[1])
+                if app_id in names
+            ][:10]
+        if recent_games:
+            with st.expander(get_text(t.RECENT_PLAY_TITLE)):
+                for name, hours in recent_games:
+                    st.markdown(f"- {name}: {hours:.1f} h")
+
+        # 2-3. Charts and table are separate fragments that poll for finished chunks while a job runs
+        polling = CLASSIFY_POLL_SECONDS if "classification_job" in st.session_state else None
+
+        def sync_classification():
+            """
+            Applies finished chunks; once the job is done, saves the labels and reruns the whole app
+            to stop polling and start the next job if the limit grew meanwhile.
+            """
+            df = st.session_state["games_data"]
+            job = st.session_state.get("classification_job")
+            if job is not None:
+                apply_finished_chunks(df, job)
+                if job.done:
+                    del st.session_state["classification_job"]
+                    if store:
+                        store.save_labels(steam_id_input, library.snapshot_labels(df))
+                    st.rerun()
+            return df, job
+
+        @st.fragment(run_every=polling)
+        def render_chart():
+            df, job = sync_classification()
+            if job is not None:
+                st.progress(job.progress, text=f"{get_text(t.AI_ANALYZING).format(job.total)} ({job.completed}/{job.total})")
+
+            # 2. Charts
+            if "Genre" in df.columns and not df.empty:
+                st.subheader(get_text(t.CHART_TITLE))
+                
+                title = f"{get_text(t.CHART_TITLE)} (Top {st.session_state['ai_limit']})"
+                fig = cached_genre_chart(library_fingerprint(df), title, df)
+                if fig is not None:
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("Not enough data classified yet.")
+
+        @st.fragment(run_every=polling)
+        def render_table():
+            df, _ = sync_classification()
+
+            # 3. Game Collection Toolbar
+            col_header, col_btn1, col_btn2 = st.columns([6, 1.5, 1.5], vertical_alignment="bottom")
             
-            df_chart = df[df["Genre"] != "Unknown"]
-            df_chart = df_chart[df_chart["Genre"] != "Unclassified"]
+            with col_header:
+                st.subheader(get_text(t.TABLE_TITLE))
             
-            if not df_chart.empty:
-                genre_counts = df_chart["Genre"].value_counts(normalize=True)
-                threshold = 0.03
-                mask = genre_counts < threshold
-                others_genres = genre_counts[mask].index.tolist()
-                
-                df_chart["Genre_Visual"] = df_chart["Genre"].apply(lambda x: "Others" if x in others_genres else x)
-                
-                fig = px.pie(
-                    df_chart, 
-                    names="Genre_Visual", 
-                    title=f"{get_text(t.CHART_TITLE)} (Top {st.session_state['ai_limit']})", 
-                    hole=0.4
-                )
-                fig.update_traces(textposition='outside', textinfo='percent+label')
-                fig.update_layout(showlegend=False)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("Not enough data classified yet.")
-        
-        # 3. Game Collection Toolbar
-        col_header, col_btn1, col_btn2 = st.columns([6, 1.5, 1.5], vertical_alignment="bottom")
-        
-        with col_header:
-            st.subheader(get_text(t.TABLE_TITLE))
-        
-        with col_btn1:
-            if st.session_state['ai_limit'] < 100:
-                if st.button(get_text(t.BTN_TOP_100), use_container_width=True):
-                    st.session_state["ai_limit"] = 100
-                    del st.session_state["games_data"]
-                    st.rerun()
-        
-        with col_btn2:
-             if st.session_state['ai_limit'] < len(df):
-                 if st.button(get_text(t.BTN_ALL), use_container_width=True):
-                    st.session_state["ai_limit"] = len(df)
-                    del st.session_state["games_data"]
-                    st.rerun()
-        
-        st.caption(get_text(t.TABLE_CAPTION).format(st.session_state['ai_limit']))
+            with col_btn1:
+                if st.session_state['ai_limit'] < 100:
+                    if st.button(get_text(t.BTN_TOP_100), use_container_width=True):
+                        st.session_state["ai_limit"] = 100
+                        st.rerun(scope="app")
+            
+            with col_btn2:
+                 if st.session_state['ai_limit'] < len(df):
+                     if st.button(get_text(t.BTN_ALL), use_container_width=True):
+                        st.session_state["ai_limit"] = len(df)
+                        st.rerun(scope="app")
+            
+            st.caption(get_text(t.TABLE_CAPTION).format(st.session_state['ai_limit']))
 
-        current_limit = st.session_state["ai_limit"]
-        st.dataframe(
-            df.head(current_limit)[["name", "playtime_hours", "Genre", "Style", "Vibe"]],
-            column_config={
-                "name": get_text(t.COL_GAME),
-                "playtime_hours": st.column_config.NumberColumn(get_text(t.COL_HOURS), format="%.1f h"),
-                "Genre": st.column_config.TextColumn(get_text(t.COL_GENRE)),
-                "Style": st.column_config.TextColumn(get_text(t.COL_STYLE)),
-                "Vibe": st.column_config.TextColumn(get_text(t.COL_VIBE)),
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=400
-        )
+            current_limit = st.session_state["ai_limit"]
+            st.dataframe(
+                df.head(current_limit)[library.TABLE_COLUMNS],
+                column_config={
+                    "name": get_text(t.COL_GAME),
+                    "playtime_hours": st.column_config.NumberColumn(get_text(t.COL_HOURS), format="%.1f h"),
+                    "Genre": st.column_config.TextColumn(get_text(t.COL_GENRE)),
+                    "Style": st.column_config.TextColumn(get_text(t.COL_STYLE)),
+                    "Vibe": st.column_config.TextColumn(get_text(t.COL_VIBE)),
+                },
+                hide_index=True,
+                use_container_width=True,
+                height=400
+            )
+
+        render_chart()
+        render_table()
         
         # 4. AI Recommendation Chat
         st.divider()
         st.subheader(get_text(t.CHAT_HEADER))
         st.caption(get_text(t.CHAT_CAPTION))
-        
-        if "chat_history" not in st.session_state:
-            st.session_state["chat_history"] = []
 
-        for msg in st.session_state["chat_history"]:
-            with st.chat_message(msg["role"]):
-                st.markdown(msg["content"])
+        # A chat turn reruns only this fragment, not the dashboard above
+        @st.fragment
+        def render_chat():
+            df = st.session_state["games_data"]
+            if "chat_history" not in st.session_state:
+                st.session_state["chat_history"] = []
+
+            for msg in st.session_state["chat_history"]:
+                with st.chat_message(msg["role"]):
+                    st.markdown(msg["content"])
         
-        user_input = st.chat_input(get_text(t.CHAT_PLACEHOLDER))
-        if user_input:
-            if not ai:
-                st.error(get_text(t.ERR_MISSING_KEY))
-            else:
-                st.session_state["chat_history"].append({"role": "user", "content": user_input})
-                with st.chat_message("user"):
-                    st.markdown(user_input)
+            user_input = st.chat_input(get_text(t.CHAT_PLACEHOLDER))
+            if user_input:
+                if not ai:
+                    st.error(get_text(t.ERR_MISSING_KEY))
+                else:
+                    st.session_state["chat_history"].append({"role": "user", "content": user_input})
+                    with st.chat_message("user"):
+                        st.markdown(user_input)
                 
-                with st.chat_message("assistant"):
-                    with st.spinner(get_text(t.AI_THINKING)):
-                        rec_context = df.head(50).to_string(index=False, columns=["name", "playtime_hours", "Genre", "Style", "Vibe"])
-                        # Pass language for appropriate response
-                        response_text = ai.get_recommendation(user_input, rec_context, language=st.session_state["language"])
-                        
-                        st.markdown(response_text)
+                    with st.chat_message("assistant"):
+                        # Rebuild the search index only when the library or its classifications change
+                        index_version = (id(df), st.session_state.get("labels_version", 0))
+                        if st.session_state.get("library_index_version") != index_version:
+                            st.session_state["library_index"] = LibraryIndex(df)
+                            st.session_state["library_index_version"] = index_version
+                        rec_context = build_library_context(
+                            df, user_input, index=st.session_state["library_index"], recent=recent_games
+                        )
+                        # Pass language for appropriate response; tokens render as they arrive
+                        response_text = st.write_stream(
+                            ai.stream_recommendation(
+                                user_input, rec_context,
+                                language=st.session_state["language"],
+                                session_id=st.session_state["session_id"]
+                            )
+                        )
                         st.session_state["chat_history"].append({"role": "assistant", "content": response_text})
 
+        render_chat()
+
 else:
     st.info(get_text(t.INFO_SIDEBAR))
+
+# Performance panel: process-wide metrics, shared by every session on this server
+if show_perf_panel:
+    snapshot = metrics.snapshot()
+    with st.sidebar:
+        st.caption(get_text(t.PERF_SPANS))
+        st.dataframe(
+            [{"span": name, **stats} for name, stats in snapshot["spans"].items()],
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(get_text(t.PERF_COUNTERS))
+        st.dataframe(
+            [{"name": c["name"], "labels": ", ".join(f"{k}={v}" for k, v in c["labels"].items()), "value": c["value"]}
+             for c in snapshot["counters"]],
+            hide_index=True,
+            use_container_width=True
+        )
+        recommender = get_ai_recommender(gemini_api_key) if gemini_api_key else None
+        if recommender is not None:
+            st.caption(get_text(t.PERF_MODELS))
+            st.dataframe(recommender.router.stats(), hide_index=True, use_container_width=True)
+        st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        st.download_button("JSON Lines", metrics.to_jsonl(), file_name="metrics.jsonl", mime="application/jsonl")
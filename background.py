@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from metrics import span, incr
+
+# Shared by every session; jobs take turns chunk by chunk, so a bulk job never starves the others
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+# Rows per classify_games call; one chunk fills a full round of concurrent LLM batches
+BACKGROUND_CHUNK_SIZE = int(os.getenv("BACKGROUND_CHUNK_SIZE", "160"))
+# Chunks of one job that may run at the same time
+BACKGROUND_JOB_CONCURRENCY = int(os.getenv("BACKGROUND_JOB_CONCURRENCY", "2"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="classify")
+        return _executor
+
+
+class _ChunkScheduler:
+    """
+    Hands the shared workers one chunk at a time, taking jobs in round-robin order. A job
+    that just started is served as soon as a worker frees up, whatever is queued before it.
+    """
+
+    def __init__(self, workers: int = BACKGROUND_WORKERS, job_concurrency: int = BACKGROUND_JOB_CONCURRENCY):
+        self.workers = max(1, workers)
+        self.job_concurrency = max(1, job_concurrency)
+        self.running = 0
+        self._jobs: "deque[ClassificationJob]" = deque()
+        self._lock = threading.Lock()
+
+    def add(self, job: "ClassificationJob"):
+        with self._lock:
+            self._jobs.append(job)
+        self._fill()
+
+    def _next_chunk(self):
+        # Rotate through the jobs, skipping finished ones and those at their concurrency limit
+        for _ in range(len(self._jobs)):
+            job = self._jobs[0]
+            if not job._queued:
+                self._jobs.popleft()
+                continue
+            self._jobs.rotate(-1)
+            if job._running < self.job_concurrency:
+                job._running += 1
+                return job, job._queued.popleft()
+        return None
+
+    def _fill(self):
+        with self._lock:
+            while self.running < self.workers:
+                picked = self._next_chunk()
+                if picked is None:
+                    return
+                self.running += 1
+                get_executor().submit(self._run, *picked)
+
+    def _run(self, job: "ClassificationJob", chunk):
+        try:
+            job._classify(*chunk)
+        finally:
+            with self._lock:
+                self.running -= 1
+                job._running -= 1
+            self._fill()
+
+
+_scheduler = _ChunkScheduler()
+
+
+class ClassificationJob:
+    """
+    Classifies the library rows at `positions` on the shared background workers, one chunk
+    per task. The workers never touch the DataFrame: the script thread drains finished
+    chunks and writes them in, so a rerun always sees a consistent table.
+    """
+
+    def __init__(self, ai, names: List[str], app_ids: List[int], positions: List[int],
+                 chunk_size: int = BACKGROUND_CHUNK_SIZE, scheduler: Optional[_ChunkScheduler] = None):
+        self.ai = ai
+        self.positions = list(positions)
+        self.total = len(names)
+        self.completed = 0
+        self.failed = 0
+        self._chunks: "queue.Queue[Tuple[List[int], Optional[list], Optional[str]]]" = queue.Queue()
+
+        chunk_size = max(1, chunk_size)
+        self._queued = deque(
+            (names[offset:offset + chunk_size], app_ids[offset:offset + chunk_size],
+             self.positions[offset:offset + chunk_size])
+            for offset in range(0, self.total, chunk_size)
+        )
+        self._pending = len(self._queued)
+        self._running = 0
+        # Chunks of one job can finish on different workers at the same time
+        self._lock = threading.Lock()
+        (scheduler or _scheduler).add(self)
+
+    def _classify(self, names: List[str], app_ids: List[int], positions: List[int]):
+        with span("background.classify", games=len(names)):
+            failed = False
+            try:
+                result = self.ai.classify_games(names, app_ids=app_ids)
+                self._chunks.put((positions, result.get("games", []), None))
+            except Exception as e:
+                print(f"Error classifying {len(names)} games in the background: {e}")
+                failed = True
+                incr("background_chunk_errors_total")
+                self._chunks.put((positions, None, str(e)))
+            with self._lock:
+                self.completed += len(names)
+                self.failed += len(names) if failed else 0
+                self._pending -= 1
+
+    def drain(self) -> List[Tuple[List[int], Optional[list], Optional[str]]]:
+        """
+        Returns the chunks finished since the last call as (positions, games, error).
+        `games` is None when the chunk failed.
+        """
+        chunks = []
+        while True:
+            try:
+                chunks.append(self._chunks.get_nowait())
+            except queue.Empty:
+                return chunks
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def done(self) -> bool:
+        return self._pending == 0 and self._chunks.empty()
+
+
+def start_classification(ai, df, positions) -> Optional[ClassificationJob]:
+    """
+    Queues classification of the rows at `positions` and returns the job, or None if there is nothing to do.
+    """
+    rows = df.iloc[list(positions)]
+    if "name" not in rows.columns or rows.empty:
+        return None
+    return ClassificationJob(ai, rows["name"].tolist(), rows["appid"].tolist(), positions)
@@ -0,0 +1,448 @@
+"""
+Offline benchmark for the library load path and chat recommendations.
+
+Synthetic GetOwnedGames / appdetails payloads are replayed through steam_api's pooled
+client and a fake chat model stands in for Gemini, so no network access is needed:
+
+    python benchmark.py --sizes 20 1000 10000 --runs 5 --llm-latency 0.05
+    python benchmark.py --json bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25   # exits 1 on regression
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from typing import Dict, List
+from urllib.parse import urlparse, parse_qs
+
+# Keep benchmark data out of the real cache; must be set before the app modules are imported
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="shelf-bench-"), "bench.db"))
+os.environ.setdefault("STEAM_API_KEY", "benchmark")
+
+import requests
+from requests.adapters import BaseAdapter
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+import steam_api
+from ai_recommender import AIRecommender
+from library import build_library, apply_classifications, genre_chart, TABLE_COLUMNS
+from library_context import build_library_context
+from store_classifier import GENRE_LABELS, PLAY_STYLE_LABELS
+
+STEAM_ID = "76561198000000000"
+QUERY = "Recommend a relaxing co-op game I have not played yet"
+
+STORE_GENRES = [("1", "Action"), ("2", "Strategy"), ("3", "RPG"), ("4", "Casual"), ("25", "Adventure"), ("28", "Simulation")]
+STORE_CATEGORIES = [[{"id": 2}], [{"id": 1}, {"id": 2}], [{"id": 9}, {"id": 38}], [{"id": 1}, {"id": 36}]]
+# The prompt restricts the model to the store vocabulary
+LLM_GENRES = GENRE_LABELS
+LLM_STYLES = PLAY_STYLE_LABELS
+LLM_VIBES = ["Casual", "Hardcore", "Story-rich", "Relaxing", "Competitive"]
+
+
+def synthetic_games(size: int, seed: int = 0) -> List[dict]:
+    """
+    GetOwnedGames-shaped entries with a long-tailed playtime distribution and ~35% unplayed.
+    """
+    rng = random.Random(seed)
+    games = []
+    for i in range(size):
+        playtime = 0 if rng.random() < 0.35 else int(rng.paretovariate(1.2) * 60)
+        games.append({
+            "appid": 10 + i * 10,
+            "name": f"Synthetic Game {i}",
+            "playtime_forever": playtime,
+            "img_icon_url": f"{rng.getrandbits(64):016x}",
+            "has_community_visible_stats": True,
+            "playtime_windows_forever": playtime,
+            "playtime_mac_forever": 0,
+            "playtime_linux_forever": 0,
+            "rtime_last_played": 1700000000 + rng.randint(0, 10 ** 7) if playtime else 0,
+        })
+    return games
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Answers Steam Web API and Store API requests from synthetic payloads.
+    About one in ten apps has no store page, like delisted titles.
+    """
+
+    def __init__(self, games: List[dict], latency: float = 0.0):
+        super().__init__()
+        self.games = games
+        self.by_id = {game["appid"]: game for game in games}
+        self.latency = latency
+
+    def _store_entry(self, app_id: int) -> dict:
+        game = self.by_id.get(app_id)
+        if game is None or app_id % 100 == 0:
+            return {"success": False}
+        genre_id, genre = STORE_GENRES[app_id % len(STORE_GENRES)]
+        return {"success": True, "data": {
+            "steam_appid": app_id,
+            "name": game["name"],
+            "genres": [{"id": genre_id, "description": genre}],
+            "categories": STORE_CATEGORIES[app_id % len(STORE_CATEGORIES)],
+        }}
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency)
+        parsed = urlparse(request.url)
+        query = parse_qs(parsed.query)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = "application/json"
+
+        if "GetOwnedGames" in parsed.path:
+            body = {"response": {"game_count": len(self.games), "games": self.games}}
+        elif parsed.path.endswith("/appdetails"):
+            app_id = int(query["appids"][0])
+            body = {str(app_id): self._store_entry(app_id)}
+        else:
+            response.status_code = 404
+            response._content = b"{}"
+            return response
+
+        response.status_code = 200
+        response._content = json.dumps(body).encode("utf-8")
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatGoogleGenerativeAI. Answers classification prompts with
+    deterministic JSON and chat prompts with canned text, after a configurable delay.
+    Token usage is estimated at four characters per token.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @staticmethod
+    def _names(prompt: str) -> List[str]:
+        block = prompt.split(":\n", 1)[1].split("\n\n", 1)[0]
+        return [name for name in block.split(", ") if name]
+
+    @staticmethod
+    def _compact_lines(prompt: str) -> List[tuple]:
+        block = prompt.split(":\n", 1)[1].split("\n\n", 1)[0]
+        return [tuple(line.split("|", 1)) for line in block.splitlines() if "|" in line]
+
+    def _reply(self, messages) -> str:
+        prompt = str(messages[-1].content)
+        if prompt.startswith("Classify these games (app_id|name):"):
+            games = []
+            for app_id, name in self._compact_lines(prompt):
+                seed = sum(map(ord, name))
+                games.append({
+                    "app_id": int(app_id),
+                    "genre": LLM_GENRES[seed % len(LLM_GENRES)],
+                    "play_style": LLM_STYLES[seed % len(LLM_STYLES)],
+                    "vibe": LLM_VIBES[seed % len(LLM_VIBES)],
+                })
+            return json.dumps({"games": games})
+        if prompt.startswith("Describe these games (app_id|name):"):
+            return json.dumps({"games": [
+                {"app_id": int(app_id), "vibe": LLM_VIBES[sum(map(ord, name)) % len(LLM_VIBES)]}
+                for app_id, name in self._compact_lines(prompt)
+            ]})
+        if prompt.startswith("Classify these games:"):
+            games = []
+            for name in self._names(prompt):
+                seed = sum(map(ord, name))
+                games.append({
+                    "game_name": name,
+                    "genre": LLM_GENRES[seed % len(LLM_GENRES)],
+                    "play_style": LLM_STYLES[seed % len(LLM_STYLES)],
+                    "vibe": LLM_VIBES[seed % len(LLM_VIBES)],
+                })
+            return json.dumps({"games": games})
+        if prompt.startswith("Describe these games:"):
+            names = self._names(prompt)
+            return json.dumps({"games": [{"game_name": name, "vibe": LLM_VIBES[sum(map(ord, name)) % len(LLM_VIBES)]} for name in names]})
+        if prompt.startswith("Current summary:"):
+            return "The user likes relaxing co-op games."
+        return ("Based on your library, try Synthetic Game 42: it is a relaxing co-op adventure "
+                "you have not started yet, and it plays well in short sessions with friends.")
+
+    @staticmethod
+    def _usage(messages, reply: str) -> dict:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        completion_tokens = len(reply) // 4
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        reply = self._reply(messages)
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, **kwargs):
+        # Stands in for native schema binding: the reply is already schema-shaped JSON
+        return self | RunnableLambda(lambda message: schema.model_validate_json(message.content))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for piece in re.split(r"(\s+)", self._reply(messages)):
+            if piece:
+                time.sleep(self.token_latency)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def install_replay(games: List[dict], latency: float):
+    adapter = ReplayAdapter(games, latency=latency)
+    client = steam_api.get_client()
+    client.session.mount("http://api.steampowered.com/", adapter)
+    client.session.mount("https://store.steampowered.com/", adapter)
+    # Lift the real rate limits; the stand-in has none
+    for host in list(steam_api.RATE_LIMITS):
+        steam_api.RATE_LIMITS[host] = (1e9, 10 ** 9)
+    steam_api._buckets.clear()
+
+
+def table_payload(df):
+    """
+    Serializes the table the way st.dataframe does (Arrow), falling back to records.
+    """
+    try:
+        import pyarrow as pa
+        return pa.Table.from_pandas(df)
+    except ImportError:
+        return df.to_dict("records")
+
+
+def run_stages(ai: AIRecommender, ai_limit: int, use_store_metadata: bool, run: int) -> Dict[str, dict]:
+    """
+    Runs the app.py load path once, returning {stage: {"seconds", "items", "peak_bytes"}}.
+    Peak memory is only measured while tracemalloc is tracing.
+    """
+    stages = {}
+
+    def timed(stage, func, *args, **kwargs):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - baseline if tracing else None
+        stages[stage] = {"seconds": seconds, "items": 0, "peak_bytes": peak}
+        return result
+
+    raw_games = timed("fetch", steam_api.get_owned_games, STEAM_ID)
+    size = len(raw_games)
+    df = timed("build", build_library, raw_games, label="Unclassified")
+
+    limit = min(ai_limit or size, size)
+    head = df.head(limit)
+    names, app_ids = head["name"].tolist(), head["appid"].tolist()
+
+    # Cold means neither classifications nor store metadata are cached. A prefetch left over
+    # from the previous run would refill the store cache behind our back, so let it finish first.
+    steam_api.wait_for_prefetch()
+    ai.classification_cache.clear()
+    store_cache = steam_api._get_store_cache()
+    if store_cache is not None:
+        store_cache.clear()
+    cold = timed("classify_cold", ai.classify_games, names, app_ids=app_ids,
+                 use_store_metadata=use_store_metadata)
+    stages["classify_cold"]["tokens"] = sum(cold.get("usage", {}).get(field, 0)
+                                            for field in ("prompt_tokens", "completion_tokens"))
+    if use_store_metadata:
+        # The cold run queued a store prefetch; a later visit with uncached classifications
+        # (e.g. after a prompt change) takes genre and play style from it and only asks for vibes
+        timed("store_prefetch", steam_api.wait_for_prefetch)
+        ai.classification_cache.clear()
+        hybrid = timed("classify_store", ai.classify_games, names, app_ids=app_ids, use_store_metadata=True)
+        stages["classify_store"]["tokens"] = sum(hybrid.get("usage", {}).get(field, 0)
+                                                 for field in ("prompt_tokens", "completion_tokens"))
+    timed("classify_warm", ai.classify_games, names, app_ids=app_ids,
+          use_store_metadata=use_store_metadata)
+    timed("apply", apply_classifications, df, 0, limit, cold.get("games", []))
+
+    def chart():
+        fig = genre_chart(df, f"Genre Preference (Top {limit})")
+        return fig.to_json() if fig is not None else None
+
+    timed("chart", chart)
+    timed("table", lambda: table_payload(df.head(limit)[TABLE_COLUMNS]))
+
+    def recommend(session_id):
+        context = build_library_context(df, QUERY)
+        return ai.get_recommendation(QUERY, context, language="en", session_id=session_id)
+
+    # First ask goes to the model, the repeat (in a fresh session) is served by the response cache
+    ai.response_cache.clear()
+    timed("recommend", recommend, f"bench-{run}")
+    timed("recommend_cached", recommend, f"bench-{run}-repeat")
+
+    items = {"fetch": size, "build": size, "recommend": 1, "recommend_cached": 1}
+    for stage in stages:
+        stages[stage]["items"] = items.get(stage, limit)
+    return stages
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def benchmark_size(size: int, args) -> Dict[str, dict]:
+    games = synthetic_games(size, seed=size)
+    install_replay(games, args.steam_latency)
+    ai = AIRecommender(llm=FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency))
+    use_store = not args.no_store_metadata
+
+    # Separate memory pass so tracing overhead does not skew the timings
+    tracemalloc.start()
+    try:
+        peaks = {stage: sample["peak_bytes"] for stage, sample in run_stages(ai, args.ai_limit, use_store, run=-1).items()}
+    finally:
+        tracemalloc.stop()
+
+    samples: Dict[str, List[dict]] = {}
+    for run in range(args.runs):
+        for stage, sample in run_stages(ai, args.ai_limit, use_store, run).items():
+            samples.setdefault(stage, []).append(sample)
+
+    results = {}
+    for stage, values in samples.items():
+        durations = [sample["seconds"] for sample in values]
+        items = values[0]["items"]
+        p50 = percentile(durations, 50)
+        results[stage] = {
+            "items": items,
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(percentile(durations, 95) * 1000, 3),
+            "throughput_per_s": round(items / p50, 1) if p50 > 0 else None,
+            "peak_mib": round(peaks[stage] / 2 ** 20, 3),
+        }
+        if "tokens" in values[0]:
+            results[stage]["tokens"] = values[0]["tokens"]
+    return results
+
+
+# What app.py imports before the sidebar renders, then the modules it loads on first use
+IMPORT_GROUPS = [
+    ("app startup", ["streamlit", "steam_api", "library_context", "metrics", "translations"]),
+    ("library", ["library"]),
+    ("plotly.express", ["plotly.express"]),
+    ("ai_recommender", ["ai_recommender"]),
+    ("langchain_google_genai", ["langchain_google_genai"]),
+]
+
+
+def import_report(runs: int = 3) -> Dict[str, float]:
+    """
+    Measures cold import time of each group in fresh interpreters (best of `runs`, in ms).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    report = {}
+    for label, modules in IMPORT_GROUPS:
+        code = (
+            "import time; start = time.perf_counter(); "
+            + "; ".join(f"import {module}" for module in modules)
+            + "; print(time.perf_counter() - start)"
+        )
+        samples = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+            if result.returncode != 0:
+                break
+            samples.append(float(result.stdout.strip().splitlines()[-1]))
+        report[label] = round(min(samples) * 1000, 1) if samples else None
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, dict]]):
+    header = f"{'size':>7} {'stage':<14} {'items':>7} {'p50 ms':>10} {'p95 ms':>10} {'items/s':>12} {'peak MiB':>9}"
+    print(header)
+    print("-" * len(header))
+    for size, stages in report.items():
+        for stage, row in stages.items():
+            throughput = "-" if row["throughput_per_s"] is None else f"{row['throughput_per_s']:.1f}"
+            print(f"{size:>7} {stage:<14} {row['items']:>7} {row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f} "
+                  f"{throughput:>12} {row['peak_mib']:>9.2f}")
+
+
+def find_regressions(report, baseline, tolerance: float) -> List[str]:
+    """
+    Lists stages whose p95 latency exceeds the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for size, stages in report.items():
+        for stage, row in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference and row["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{size} {stage}: p95 {row['p95_ms']:.2f} ms vs baseline {reference['p95_ms']:.2f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the SHELF load path and recommendations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 1000, 10000], help="Library sizes to simulate")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per library size")
+    parser.add_argument("--ai-limit", type=int, default=0, help="Games to classify (0 = whole library, like 'All')")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per streamed fake token")
+    parser.add_argument("--steam-latency", type=float, default=0.0, help="Seconds per replayed Steam request")
+    parser.add_argument("--no-store-metadata", action="store_true", help="Skip the Store API hybrid classifier")
+    parser.add_argument("--skip-imports", action="store_true", help="Skip the cold import-time report")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown versus the baseline")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for size in args.sizes:
+        report[str(size)] = benchmark_size(size, args)
+    print_report(report)
+
+    if not args.skip_imports:
+        imports = import_report()
+        print("\nCold import time (ms, best of 3):")
+        for label, ms in imports.items():
+            print(f"  {label:<24} {'failed' if ms is None else f'{ms:.1f}'}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "CACHE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "shelf.db")
+)
+# Reads refresh an entry's LRU timestamp at most this often, so hot keys don't turn every read into a write
+CACHE_TOUCH_INTERVAL = float(os.getenv("CACHE_TOUCH_INTERVAL", "60"))
+
+
+class SqliteCache:
+    """
+    Small persistent key/value store backed by SQLite.
+    Entries live in a shared table partitioned by namespace, expire after `ttl`
+    seconds and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, namespace: str, path: Optional[str] = None,
+                 ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (namespace, accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call keeps the store safe to share across
+        # Streamlit sessions and worker threads. The inner block commits or rolls
+        # back; closing() releases the file handle, which sqlite3's own context
+        # manager does not.
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return self.ttl is None or now - created_at < self.ttl
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns a dict of the fresh entries found for `keys`. Missing or expired keys are omitted.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        touched = []
+        expired = []
+        with self._connect() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, created_at, accessed_at FROM entries WHERE namespace = ? AND key IN ({placeholders})",
+                    [self.namespace, *chunk]
+                ).fetchall()
+                for key, value, created_at, accessed_at in rows:
+                    if self._is_fresh(created_at, now):
+                        found[key] = json.loads(value)
+                        # Access times only matter for LRU eviction
+                        if self.max_entries is not None and now - accessed_at >= CACHE_TOUCH_INTERVAL:
+                            touched.append(key)
+                    else:
+                        expired.append(key)
+
+            if touched:
+                conn.executemany(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, key) for key in touched]
+                )
+            if expired:
+                conn.executemany(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                    [(self.namespace, key) for key in expired]
+                )
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: Dict[str, Any]):
+        """
+        Inserts or replaces entries, then evicts expired and least recently used ones.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()]
+            )
+            self._evict(conn, now)
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def _evict(self, conn, now: float):
+        if self.ttl is not None:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl)
+            )
+        if self.max_entries is not None:
+            conn.execute(
+                """
+                DELETE FROM entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM entries WHERE namespace = ?
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.namespace, self.namespace, self.max_entries)
+            )
@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from library import add_label_columns
+from metrics import span
+from steam_api import get_owned_games
+
+# Libraries fetched at once; requests share steam_api's pooled client and rate limiter
+GROUP_FETCH_WORKERS = int(os.getenv("GROUP_FETCH_WORKERS", "8"))
+# Style labels that make a game worth suggesting to a group
+MULTIPLAYER_KEYWORDS = ("co-op", "coop", "multiplayer", "multi-player", "online", "pvp")
+
+
+def fetch_libraries(steam_ids: List[str], max_workers: Optional[int] = None) -> Dict[str, Optional[list]]:
+    """
+    Fetches every member's owned games concurrently. Failed fetches map to None.
+    """
+    steam_ids = list(dict.fromkeys(steam_ids))
+    if not steam_ids:
+        return {}
+    with span("group.fetch_libraries", members=len(steam_ids)):
+        with ThreadPoolExecutor(max_workers=min(len(steam_ids), max_workers or GROUP_FETCH_WORKERS)) as executor:
+            return dict(zip(steam_ids, executor.map(get_owned_games, steam_ids)))
+
+
+class GroupLibrary:
+    """
+    Appid-indexed overlap of several libraries: which members own each game and how long
+    each of them played it. `df` has one row per game, most widely owned first, with the
+    same label columns as a single library so classification works on it unchanged.
+    """
+
+    def __init__(self, libraries: Dict[str, Optional[list]], label: str = "Unclassified"):
+        self.members = [steam_id for steam_id, games in libraries.items() if games]
+
+        names = {}
+        for steam_id in self.members:
+            for game in libraries[steam_id]:
+                names.setdefault(int(game["appid"]), game.get("name", str(game["appid"])))
+        app_ids = np.fromiter(names, dtype=np.int64, count=len(names))
+        position = pd.Index(app_ids)
+
+        owned = np.zeros((len(app_ids), len(self.members)), dtype=bool)
+        playtime = np.zeros((len(app_ids), len(self.members)), dtype=np.int64)
+        for column, steam_id in enumerate(self.members):
+            games = libraries[steam_id]
+            rows = position.get_indexer([int(game["appid"]) for game in games])
+            owned[rows, column] = True
+            playtime[rows, column] = [game.get("playtime_forever", 0) for game in games]
+
+        owners = owned.sum(axis=1)
+        total_minutes = playtime.sum(axis=1)
+        # Most widely owned first, then least played: ranking reads a prefix of this order
+        order = np.lexsort((total_minutes, -owners))
+
+        self.owned = owned[order]
+        self.playtime = playtime[order]
+        self.df = pd.DataFrame({
+            "appid": app_ids[order],
+            "name": [names[app_id] for app_id in app_ids[order]],
+            "owners": owners[order],
+            "playtime_hours": (total_minutes[order] / 60).round(1),
+        })
+        add_label_columns(self.df, label)
+
+    def shared_rows(self, min_owners: int) -> np.ndarray:
+        """
+        Positions of games owned by at least `min_owners` members (a prefix of `df`).
+        """
+        # owners is sorted descending, so the matching rows end where it drops below min_owners
+        end = np.searchsorted(-self.df["owners"].to_numpy(), -min_owners, side="right")
+        return np.arange(end)
+
+    def _multiplayer_mask(self, rows: np.ndarray) -> np.ndarray:
+        style = self.df["Style"].cat
+        matches = np.array([
+            any(keyword in str(category).lower() for keyword in MULTIPLAYER_KEYWORDS)
+            for category in style.categories
+        ] + [False])
+        # Codes index the per-category answer; -1 (missing) lands on the trailing False
+        return matches[style.codes.to_numpy()[rows]]
+
+    def rank(self, min_owners: Optional[int] = None, multiplayer_only: bool = True,
+             max_hours: Optional[float] = None, limit: int = 20) -> pd.DataFrame:
+        """
+        Games owned by at least `min_owners` members (default: everyone), optionally only
+        co-op/multiplayer ones and those under `max_hours` of combined playtime, least played first.
+        A `missing` column lists the members who do not own each game.
+        """
+        min_owners = len(self.members) if min_owners is None else min_owners
+        rows = self.shared_rows(min_owners)
+        if multiplayer_only:
+            rows = rows[self._multiplayer_mask(rows)]
+        if max_hours is not None:
+            rows = rows[self.df["playtime_hours"].to_numpy()[rows] <= max_hours]
+
+        hours = self.df["playtime_hours"].to_numpy()[rows]
+        owners = self.df["owners"].to_numpy()[rows]
+        rows = rows[np.lexsort((hours, -owners))][:limit]
+
+        result = self.df.iloc[rows].copy()
+        members = np.array(self.members, dtype=object)
+        result["missing"] = [", ".join(members[~self.owned[row]]) for row in rows]
+        return result
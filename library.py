@@ -0,0 +1,204 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from metrics import timed_import
+
+ICON_URL_PREFIX = "http://media.steampowered.com/steamcommunity/public/images/apps/"
+CLASSIFICATION_FIELDS = {"Genre": "genre", "Style": "play_style", "Vibe": "vibe"}
+TABLE_COLUMNS = ["name", "playtime_hours", "Genre", "Style", "Vibe"]
+# Placeholder labels are always categories so rows can be reset without re-encoding
+BASE_LABELS = ["Unknown", "Unclassified", "Pending"]
+# Genres below this share of the chart are grouped into "Others"
+OTHERS_THRESHOLD = 0.03
+
+
+def build_library(raw_games, label: str = "Unknown") -> pd.DataFrame:
+    """
+    Builds the library DataFrame from a GetOwnedGames payload, sorted by playtime.
+    Genre/Style/Vibe are categorical columns that start out as `label` until rows are classified.
+    """
+    df_raw = pd.DataFrame(raw_games)
+
+    if "playtime_forever" in df_raw.columns:
+        df_raw["playtime_hours"] = (df_raw["playtime_forever"] / 60).round(1)
+    else:
+        df_raw["playtime_hours"] = 0.0
+
+    df_raw = df_raw.sort_values(by="playtime_forever", ascending=False, kind="stable", ignore_index=True)
+
+    if "img_icon_url" in df_raw.columns:
+        df_raw["icon_url"] = (
+            ICON_URL_PREFIX + df_raw["appid"].astype(str) + "/" + df_raw["img_icon_url"].astype(str) + ".jpg"
+        )
+    else:
+        df_raw["icon_url"] = ""
+
+    add_label_columns(df_raw, label)
+    return df_raw
+
+
+def add_label_columns(df: pd.DataFrame, label: str = "Unknown"):
+    """
+    Adds categorical Genre/Style/Vibe columns set to `label` on every row.
+    """
+    categories = BASE_LABELS if label in BASE_LABELS else BASE_LABELS + [label]
+    codes = np.full(len(df), categories.index(label), dtype=np.int8)
+    for column in CLASSIFICATION_FIELDS:
+        df[column] = pd.Categorical.from_codes(codes, categories=categories)
+
+
+def _assign_labels(df: pd.DataFrame, rows, column: str, values):
+    """
+    Writes `values` into the given rows (a slice or an array of positions) of a categorical
+    column by rewriting its codes, registering any new categories first.
+    """
+    values = np.asarray(values, dtype=object)
+    current = df[column].cat
+    categories = current.categories.append(pd.Index(pd.unique(values)).difference(current.categories))
+    codes = current.codes.to_numpy().astype(np.int32)
+    codes[rows] = categories.get_indexer(values)
+    df[column] = pd.Categorical.from_codes(codes, categories=categories)
+
+
+def set_labels(df: pd.DataFrame, start: int, end: int, label: str):
+    """
+    Sets Genre/Style/Vibe of rows [start, end) to a single label (e.g. "Unknown" after a failure).
+    """
+    set_labels_at(df, np.arange(len(df))[start:end], label)
+
+
+def set_labels_at(df: pd.DataFrame, positions, label: str):
+    """
+    Sets Genre/Style/Vibe of the rows at `positions` to a single label.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    for column in CLASSIFICATION_FIELDS:
+        _assign_labels(df, positions, column, [label] * len(positions))
+
+
+def apply_classifications(df: pd.DataFrame, start: int, end: int, classified_list):
+    """
+    Writes classification results into rows [start, end) of the library in place.
+    Results carrying an `app_id` are matched by app id, the rest by `game_name`.
+    Games missing from the results are marked "Unclassified".
+    """
+    apply_classifications_at(df, np.arange(len(df))[start:end], classified_list)
+
+
+def apply_classifications_at(df: pd.DataFrame, positions, classified_list):
+    """
+    Same as `apply_classifications`, for the rows at `positions`.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    # Later results win, as with a dict built from the list
+    by_id, by_name = {}, {}
+    for item in classified_list:
+        if not isinstance(item, dict):
+            continue
+        if item.get("app_id") is not None and "appid" in df.columns:
+            by_id[int(item["app_id"])] = item
+        elif "game_name" in item:
+            by_name[item["game_name"]] = item
+
+    # One hash lookup per row, shared by all three columns
+    matches = np.full(len(positions), -1, dtype=np.int64)
+    if by_id:
+        matches = pd.Index(list(by_id), dtype=np.int64).get_indexer(df["appid"].to_numpy()[positions].astype(np.int64))
+    if by_name:
+        name_matches = pd.Index(list(by_name), dtype=object).get_indexer(df["name"].to_numpy()[positions])
+        matches = np.where(matches >= 0, matches, np.where(name_matches >= 0, name_matches + len(by_id), -1))
+    found = matches >= 0
+    items = list(by_id.values()) + list(by_name.values())
+
+    for column, field in CLASSIFICATION_FIELDS.items():
+        labels = np.array([item.get(field) or "Unclassified" for item in items] + ["Unclassified"], dtype=object)
+        values = labels[np.where(found, matches, len(items))]
+        _assign_labels(df, positions, column, values.astype(str))
+
+
+def unlabeled_rows(df: pd.DataFrame, start: int, end: int) -> np.ndarray:
+    """
+    Positions in [start, end) where any of Genre/Style/Vibe is still a placeholder.
+    """
+    window = df.iloc[start:end]
+    missing = np.zeros(len(window), dtype=bool)
+    for column in CLASSIFICATION_FIELDS:
+        missing |= window[column].isin(BASE_LABELS).to_numpy()
+    return np.flatnonzero(missing) + max(0, start)
+
+
+def snapshot_labels(df: pd.DataFrame) -> dict:
+    """
+    Returns {appid: [genre, play_style, vibe]} for fully classified rows, for saving with a snapshot.
+    """
+    columns = list(CLASSIFICATION_FIELDS)
+    done = np.ones(len(df), dtype=bool)
+    for column in columns:
+        done &= ~df[column].isin(BASE_LABELS).to_numpy()
+    rows = df.loc[done, ["appid"] + columns]
+    return {int(row[0]): [str(value) for value in row[1:]] for row in rows.itertuples(index=False)}
+
+
+def restore_labels(df: pd.DataFrame, labels: dict):
+    """
+    Writes saved labels ({appid: [genre, play_style, vibe]}) back onto matching rows.
+    Rows without a saved label keep their current one.
+    """
+    if not labels or df.empty:
+        return
+    positions = np.flatnonzero(df["appid"].astype(np.int64).isin(list(labels)).to_numpy())
+    items = [
+        {"app_id": app_id, **dict(zip(CLASSIFICATION_FIELDS.values(), value))}
+        for app_id, value in labels.items()
+    ]
+    apply_classifications_at(df, positions, items)
+
+
+def library_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of what the dashboard shows (games, playtime, labels), for keying cached aggregates.
+    """
+    columns = [column for column in ["appid"] + TABLE_COLUMNS if column in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return hashlib.sha1(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def library_stats(df: pd.DataFrame) -> dict:
+    """
+    Headline numbers for the dashboard: game count, total hours and the most played game.
+    """
+    return {
+        "games": len(df),
+        "hours": int(df["playtime_hours"].sum()) if "playtime_hours" in df.columns else 0,
+        "most_played": df.iloc[0]["name"] if not df.empty else "N/A",
+    }
+
+
+def genre_chart(df: pd.DataFrame, title: str):
+    """
+    Returns the genre preference pie chart, or None when nothing is classified yet.
+    """
+    genres = df["Genre"]
+    genres = genres[~genres.isin(BASE_LABELS)]
+    if genres.empty:
+        return None
+
+    genre_counts = genres.value_counts()
+    genre_counts = genre_counts[genre_counts > 0]
+    shares = genre_counts / genre_counts.sum()
+    # Aggregate before plotting so the figure carries one value per slice, not one per game
+    visual = genre_counts.groupby(
+        np.where(shares < OTHERS_THRESHOLD, "Others", genre_counts.index.astype(str))
+    ).sum()
+
+    # Plotly is only needed once there is something to chart
+    px = timed_import("plotly.express")
+    fig = px.pie(
+        names=visual.index,
+        values=visual.values,
+        title=title,
+        hole=0.4
+    )
+    fig.update_traces(textposition='outside', textinfo='percent+label')
+    fig.update_layout(showlegend=False)
+    return fig
@@ -0,0 +1,173 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+LIBRARY_CONTEXT_TOKENS = int(os.getenv("LIBRARY_CONTEXT_TOKENS", "1500"))
+
+UNLABELED = {"Unknown", "Unclassified", "Pending", ""}
+
+# Common Korean request words mapped onto the English labels the library is classified with
+QUERY_SYNONYMS = {
+    "힐링": "relaxing casual cozy",
+    "캐주얼": "casual",
+    "멀티": "multiplayer",
+    "협동": "co-op",
+    "친구": "co-op multiplayer",
+    "혼자": "single-player",
+    "싱글": "single-player",
+    "공포": "horror",
+    "전략": "strategy",
+    "퍼즐": "puzzle",
+    "스토리": "story-rich story",
+    "어려운": "hardcore difficult",
+    "하드코어": "hardcore",
+    "액션": "action",
+    "레이싱": "racing",
+    "스포츠": "sports",
+    "시뮬레이션": "simulation",
+    "어드벤처": "adventure",
+    "미플레이": "unplayed",
+    "백로그": "unplayed backlog",
+}
+
+_TOKEN_RE = re.compile(r"[\w\-]+")
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic that stays conservative for mixed Korean/English text
+    return max(1, len(text) // 3)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _expand_query(query: str) -> List[str]:
+    tokens = []
+    for token in _tokenize(query):
+        tokens.append(token)
+        for keyword, expansion in QUERY_SYNONYMS.items():
+            if keyword in token:
+                tokens.extend(expansion.split())
+    return tokens
+
+
+class LibraryIndex:
+    """
+    In-memory TF-IDF index over a library DataFrame (name, Genre, Style, Vibe, playtime),
+    used to pick the rows most relevant to a chat query.
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.vectors: List[Dict[str, float]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        documents = [self._document(row) for row in self.df.itertuples(index=False)]
+        doc_freq = Counter(token for doc in documents for token in set(doc))
+        total = len(documents)
+        self.idf = {token: math.log((1 + total) / (1 + count)) + 1 for token, count in doc_freq.items()}
+
+        for position, doc in enumerate(documents):
+            counts = Counter(doc)
+            vector = {token: (1 + math.log(count)) * self.idf[token] for token, count in counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            self.vectors.append({token: weight / norm for token, weight in vector.items()})
+            for token in counts:
+                self.postings.setdefault(token, []).append(position)
+
+    @staticmethod
+    def _document(row) -> List[str]:
+        tokens = _tokenize(getattr(row, "name", ""))
+        for field in ("Genre", "Style", "Vibe"):
+            value = str(getattr(row, field, ""))
+            if value not in UNLABELED:
+                tokens.extend(_tokenize(value))
+        hours = getattr(row, "playtime_hours", 0) or 0
+        if hours == 0:
+            tokens.extend(["unplayed", "backlog"])
+        elif hours < 2:
+            tokens.append("barely-played")
+        return tokens
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """
+        Returns row positions (into `self.df`) ranked by cosine similarity to `query`.
+        """
+        query_counts = Counter(token for token in _expand_query(query) if token in self.idf)
+        if not query_counts:
+            return []
+
+        query_vector = {token: (1 + math.log(count)) * self.idf[token] for token, count in query_counts.items()}
+        scores: Dict[int, float] = {}
+        for token, weight in query_vector.items():
+            for position in self.postings.get(token, []):
+                scores[position] = scores.get(position, 0.0) + weight * self.vectors[position][token]
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return ranked[:limit]
+
+
+def _format_row(row) -> str:
+    fields = [str(row["name"]), f"{row['playtime_hours']:g}h"]
+    for field in ("Genre", "Style", "Vibe"):
+        value = str(row.get(field, ""))
+        fields.append(value if value not in UNLABELED else "-")
+    return " | ".join(fields)
+
+
+def _summary(df) -> str:
+    lines = [
+        f"Library: {len(df)} games, {int(df['playtime_hours'].sum())} hours played, "
+        f"{int((df['playtime_hours'] == 0).sum())} never played."
+    ]
+    if "Genre" in df.columns:
+        labeled = df[~df["Genre"].astype(str).isin(UNLABELED)]
+        if not labeled.empty:
+            counts = labeled["Genre"].astype(str).value_counts().head(8)
+            unplayed = labeled[labeled["playtime_hours"] == 0]["Genre"].astype(str).value_counts()
+            genres = ", ".join(f"{genre} {count} ({int(unplayed.get(genre, 0))} unplayed)" for genre, count in counts.items())
+            lines.append(f"Genres among {len(labeled)} classified games: {genres}.")
+    return "\n".join(lines)
+
+
+def build_library_context(df, query: str, token_budget: int = LIBRARY_CONTEXT_TOKENS, index: Optional[LibraryIndex] = None,
+                          recent: Optional[List[Tuple[str, float]]] = None) -> str:
+    """
+    Packs aggregate stats plus the library rows most relevant to `query` into roughly
+    `token_budget` tokens. Rows are query matches first, then most played, then unplayed games.
+    `recent` lists (name, hours) played over the last week, from saved snapshots.
+    """
+    if df is None or df.empty:
+        return "The library is empty."
+
+    index = index or LibraryIndex(df)
+    rows = index.df
+
+    header = _summary(rows)
+    if recent:
+        header += "\nPlayed in the last 7 days: " + ", ".join(f"{name} {hours:.1f}h" for name, hours in recent) + "."
+    header += "\nGames (name | hours | genre | style | vibe):"
+    lines = [header]
+    used = estimate_tokens(header)
+
+    candidates = index.search(query)
+    candidates += list(range(min(len(rows), 30)))
+    candidates += rows.index[rows["playtime_hours"] == 0].tolist()[:30]
+    candidates += list(range(len(rows)))
+
+    seen = set()
+    for position in candidates:
+        if position in seen:
+            continue
+        seen.add(position)
+        line = _format_row(rows.iloc[position])
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+
+    return "\n".join(lines)
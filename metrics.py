@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import importlib
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Optional file that receives one JSON line per finished span
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH")
+METRICS_PREFIX = "shelf"
+RECENT_SAMPLES = 512
+
+
+def _label_key(labels: Dict[str, object]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, **extra) -> str:
+    pairs = list(labels) + sorted((key, str(value)) for key, value in extra.items())
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Metrics:
+    """
+    Process-wide span timings and counters, exportable as Prometheus text or JSON lines.
+    Shared by every Streamlit session, so it reflects load across users.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = METRICS_JSONL_PATH):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._spans: Dict[str, dict] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._events = deque(maxlen=RECENT_SAMPLES)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Times the enclosed block. Attributes can be added through the yielded dict
+        (e.g. item counts) and are kept on the JSON-lines event.
+        """
+        attributes = dict(attributes)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, error=error, **attributes)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None, **attributes):
+        event = {"ts": round(time.time(), 3), "span": name, "seconds": round(seconds, 6), **attributes}
+        if error:
+            event["error"] = error
+
+        with self._lock:
+            stats = self._spans.setdefault(name, {
+                "count": 0, "errors": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=RECENT_SAMPLES)
+            })
+            stats["count"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+            self._events.append(event)
+
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+    def incr(self, name: str, value: float = 1, **labels):
+        if not value:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "total_s": round(stats["total"], 6),
+                    "max_s": round(stats["max"], 6),
+                    "p50_s": round(_percentile(stats["recent"], 50), 6),
+                    "p95_s": round(_percentile(stats["recent"], 95), 6),
+                }
+                for name, stats in self._spans.items()
+            }
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"spans": spans, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        lines = []
+        snapshot = self.snapshot()
+
+        span_metric = f"{METRICS_PREFIX}_span_seconds"
+        if snapshot["spans"]:
+            lines.append(f"# TYPE {span_metric} summary")
+        for name, stats in snapshot["spans"].items():
+            labels = (("span", name),)
+            lines.append(f"{span_metric}{_format_labels(labels, quantile='0.5')} {stats['p50_s']}")
+            lines.append(f"{span_metric}{_format_labels(labels, quantile='0.95')} {stats['p95_s']}")
+            lines.append(f"{span_metric}_sum{_format_labels(labels)} {stats['total_s']}")
+            lines.append(f"{span_metric}_count{_format_labels(labels)} {stats['count']}")
+        if snapshot["spans"]:
+            lines.append(f"# TYPE {METRICS_PREFIX}_span_errors_total counter")
+        for name, stats in snapshot["spans"].items():
+            lines.append(f"{METRICS_PREFIX}_span_errors_total{_format_labels((('span', name),))} {stats['errors']}")
+
+        declared = set()
+        for counter in snapshot["counters"]:
+            metric = f"{METRICS_PREFIX}_{counter['name']}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            labels = tuple(sorted(counter["labels"].items()))
+            lines.append(f"{metric}{_format_labels(labels)} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            events = list(self._events)
+        return "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in events)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._events.clear()
+
+
+metrics = Metrics()
+span = metrics.span
+incr = metrics.incr
+
+
+def timed_import(name: str):
+    """
+    Imports a module on first use and records the import time as an `import.<name>` span.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    metrics.record(f"import.{name}", time.perf_counter() - start)
+    return module
@@ -0,0 +1,605 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from metrics import incr
+
+# A model is skipped while its recent error rate or median latency is above these
+ROUTER_ERROR_RATE_THRESHOLD = float(os.getenv("ROUTER_ERROR_RATE_THRESHOLD", "0.5"))
+ROUTER_LATENCY_THRESHOLD = float(os.getenv("ROUTER_LATENCY_THRESHOLD", "10"))
+# Calls considered for the error rate and latency; fewer than ROUTER_MIN_SAMPLES never marks a model unhealthy
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "20"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "4"))
+# Non-streamed latency is counted per this many output tokens, so long answers don't look slow
+ROUTER_LATENCY_TOKENS = int(os.getenv("ROUTER_LATENCY_TOKENS", "500"))
+# Interactive calls start a backup request when the first one is silent for this long (0 disables)
+ROUTER_HEDGE_AFTER = float(os.getenv("ROUTER_HEDGE_AFTER", "4"))
+# Share of each model's per-minute quota that background classification may not use
+ROUTER_INTERACTIVE_RESERVE = float(os.getenv("ROUTER_INTERACTIVE_RESERVE", "0.25"))
+# Outcomes and latencies older than this no longer count towards a model's health
+ROUTER_SAMPLE_MAX_AGE = float(os.getenv("ROUTER_SAMPLE_MAX_AGE", "120"))
+# An unhealthy model still gets one probe call this often, so it can recover
+ROUTER_PROBE_INTERVAL = float(os.getenv("ROUTER_PROBE_INTERVAL", "15"))
+# Longest a background call waits for quota before going ahead anyway
+ROUTER_MAX_QUOTA_WAIT = float(os.getenv("ROUTER_MAX_QUOTA_WAIT", "120"))
+# "model=rpm:tpm" pairs, comma-separated; 0 or missing means unlimited
+MODEL_QUOTAS = os.getenv("MODEL_QUOTAS", "")
+
+INTERACTIVE_PURPOSES = {"chat", "summarize"}
+
+
+def parse_quotas(text: str) -> Dict[str, Tuple[int, int]]:
+    quotas = {}
+    for entry in text.split(","):
+        name, _, limits = entry.strip().partition("=")
+        if not name or not limits:
+            continue
+        rpm, _, tpm = limits.partition(":")
+        try:
+            quotas[name.strip()] = (int(rpm or 0), int(tpm or 0))
+        except ValueError:
+            print(f"Ignoring malformed model quota: {entry}")
+    return quotas
+
+
+class _EndpointCallback(BaseCallbackHandler):
+    """
+    Feeds latency, token usage and errors of every call made through an endpoint for one
+    purpose back into it. Streamed calls count the time to the first token; other calls
+    count their duration scaled down to ROUTER_LATENCY_TOKENS output tokens, so a long
+    answer from a healthy model is not mistaken for a slow model.
+    """
+
+    def __init__(self, endpoint: "ModelEndpoint", purpose: str):
+        self.endpoint = endpoint
+        self.purpose = purpose
+        self._starts: Dict[object, float] = {}
+        self._first_tokens: Dict[object, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def _latency(self, run_id, output_tokens: int = 0) -> float:
+        with self._lock:
+            start = self._starts.pop(run_id, None)
+            first_token = self._first_tokens.pop(run_id, None)
+        if first_token is not None:
+            return first_token
+        if start is None:
+            return 0.0
+        elapsed = time.perf_counter() - start
+        if output_tokens > ROUTER_LATENCY_TOKENS > 0:
+            elapsed *= ROUTER_LATENCY_TOKENS / output_tokens
+        return elapsed
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            if run_id in self._starts and run_id not in self._first_tokens:
+                self._first_tokens[run_id] = now - self._starts[run_id]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens = 0
+        output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                tokens += usage.get("total_tokens", usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+                output_tokens += usage.get("output_tokens", 0)
+        self.endpoint.record(self._latency(run_id, output_tokens), ok=True, tokens=tokens, purpose=self.purpose)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.endpoint.record(self._latency(run_id), ok=False, purpose=self.purpose)
+
+
+class ModelEndpoint:
+    """
+    One chat model client with its own per-minute request/token quota and a rolling window
+    of recent outcomes and per-purpose latencies. Purposes routed to the same model name
+    share one endpoint, but long classification batches never make chat look slow.
+    """
+
+    def __init__(self, name: str, llm, rpm: int = 0, tpm: int = 0):
+        self.name = name
+        self.llm = llm
+        self.rpm = rpm
+        self.tpm = tpm
+        self._callbacks: Dict[str, _EndpointCallback] = {}
+        self._lock = threading.Lock()
+        self._requests = deque()  # (timestamp, purpose)
+        self._tokens = deque()  # (timestamp, tokens)
+        self._latencies: Dict[str, deque] = {}  # purpose -> (timestamp, seconds)
+        self._outcomes = deque(maxlen=ROUTER_WINDOW)  # (timestamp, ok)
+        self._last_probe = 0.0
+        self.total_requests = 0
+        self.total_errors = 0
+        self.total_tokens = 0
+
+    def _prune(self, now: float):
+        while self._requests and now - self._requests[0][0] > 60:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] > 60:
+            self._tokens.popleft()
+
+    def reserve(self, purpose: str, requests: int = 1):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._requests.extend((now, purpose) for _ in range(requests))
+            self.total_requests += requests
+
+    def callback_for(self, purpose: str) -> _EndpointCallback:
+        with self._lock:
+            if purpose not in self._callbacks:
+                self._callbacks[purpose] = _EndpointCallback(self, purpose)
+            return self._callbacks[purpose]
+
+    def record(self, seconds: float, ok: bool, tokens: int = 0, purpose: str = "chat"):
+        now = time.time()
+        with self._lock:
+            self._outcomes.append((now, ok))
+            if ok:
+                self._latencies.setdefault(purpose, deque(maxlen=ROUTER_WINDOW)).append((now, seconds))
+            else:
+                self.total_errors += 1
+            if tokens:
+                self._tokens.append((now, tokens))
+                self.total_tokens += tokens
+
+    def available(self, purpose: str) -> Optional[int]:
+        """
+        How many more calls fit this minute's quota, or None without a request limit.
+        Background purposes only get the share left after the interactive reserve.
+        """
+        share = 1.0 if purpose in INTERACTIVE_PURPOSES else 1.0 - ROUTER_INTERACTIVE_RESERVE
+        with self._lock:
+            self._prune(time.time())
+            used_requests = len(self._requests)
+            used_tokens = sum(tokens for _, tokens in self._tokens)
+        if self.tpm and used_tokens >= self.tpm * share:
+            return 0
+        if not self.rpm:
+            return None
+        return max(0, int(self.rpm * share) - used_requests)
+
+    def has_quota(self, purpose: str, requests: int = 1) -> bool:
+        """
+        Whether `requests` more calls fit this minute's quota.
+        """
+        available = self.available(purpose)
+        return available is None or available >= requests
+
+    def _recent(self, samples) -> list:
+        since = time.time() - ROUTER_SAMPLE_MAX_AGE
+        return [value for timestamp, value in samples if timestamp >= since]
+
+    def _p50(self, purpose: str) -> Optional[float]:
+        latencies = sorted(self._recent(self._latencies.get(purpose, ())))
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def health(self, purpose: str = "chat") -> Tuple[bool, str]:
+        """
+        (healthy, "ok" / "errors" / "slow") from the last ROUTER_SAMPLE_MAX_AGE seconds.
+        Errors count across purposes; latency only against calls made for `purpose`.
+        """
+        with self._lock:
+            outcomes = self._recent(self._outcomes)
+            latencies = self._recent(self._latencies.get(purpose, ()))
+        if len(outcomes) >= ROUTER_MIN_SAMPLES:
+            if outcomes.count(False) / len(outcomes) > ROUTER_ERROR_RATE_THRESHOLD:
+                return False, "errors"
+        latencies.sort()
+        if len(latencies) >= ROUTER_MIN_SAMPLES and latencies[len(latencies) // 2] > ROUTER_LATENCY_THRESHOLD:
+            return False, "slow"
+        return True, "ok"
+
+    def claim_probe(self) -> bool:
+        """
+        Lets one call through to an unhealthy model every ROUTER_PROBE_INTERVAL seconds.
+        Its outcome decides whether the model takes traffic again.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._last_probe < ROUTER_PROBE_INTERVAL:
+                return False
+            self._last_probe = now
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            purposes = sorted(self._latencies)
+        states = {purpose: self.health(purpose) for purpose in purposes} or {"all": self.health()}
+        with self._lock:
+            self._prune(time.time())
+            outcomes = self._recent(self._outcomes)
+            return {
+                "model": self.name,
+                "healthy": all(healthy for healthy, _ in states.values()),
+                "state": ", ".join(f"{purpose}={state}" for purpose, (_, state) in states.items()),
+                "requests_1m": len(self._requests),
+                "rpm_limit": self.rpm or None,
+                "tokens_1m": sum(tokens for _, tokens in self._tokens),
+                "tpm_limit": self.tpm or None,
+                "p50_s": ", ".join(
+                    f"{purpose}={round(self._p50(purpose), 3)}" for purpose in purposes if self._p50(purpose) is not None
+                ) or None,
+                "error_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                "requests": self.total_requests,
+                "errors": self.total_errors,
+                "tokens": self.total_tokens,
+            }
+
+
+class ModelRouter:
+    """
+    Picks a model per purpose ("chat", "summarize", "classify") from an ordered list of
+    endpoints: the first healthy one with quota wins. Interactive calls fail over on
+    errors and hedge with a backup model when the first answer is slow; background
+    classification waits for quota instead of eating into the interactive reserve.
+    """
+
+    def __init__(self, routes: Dict[str, List[ModelEndpoint]], hedge_after: float = ROUTER_HEDGE_AFTER):
+        self.routes = routes
+        self.hedge_after = hedge_after
+        self._decisions: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def single(cls, llm, name: str) -> "ModelRouter":
+        endpoint = ModelEndpoint(name, llm)
+        return cls({purpose: [endpoint] for purpose in ("chat", "summarize", "classify")})
+
+    def primary(self, purpose: str) -> ModelEndpoint:
+        return self.routes[purpose][0]
+
+    def endpoints(self) -> List[ModelEndpoint]:
+        return list({id(endpoint): endpoint for route in self.routes.values() for endpoint in route}.values())
+
+    def _decide(self, purpose: str, endpoint: ModelEndpoint, reason: str) -> ModelEndpoint:
+        with self._lock:
+            key = (purpose, endpoint.name, reason)
+            self._decisions[key] = self._decisions.get(key, 0) + 1
+        incr("model_route_decisions_total", purpose=purpose, model=endpoint.name, reason=reason)
+        return endpoint
+
+    def select(self, purpose: str, requests: int = 1, exclude: Optional[ModelEndpoint] = None) -> Optional[ModelEndpoint]:
+        """
+        Returns the endpoint to use and reserves `requests` calls on it. Background purposes
+        block (up to ROUTER_MAX_QUOTA_WAIT) while every model is out of quota. With `exclude`,
+        returns None when no other endpoint is available.
+        """
+        selected = self._select(purpose, requests, exclude, partial=False)
+        return selected[0] if selected else None
+
+    def select_batch(self, purpose: str, requests: int) -> Tuple[ModelEndpoint, int]:
+        """
+        Returns (endpoint, granted): reserves as many of `requests` calls as the chosen model's
+        quota allows right now, at least one. Callers send `granted` calls and come back for
+        the rest, so a large batch never bursts past the quota or into the interactive reserve.
+        """
+        return self._select(purpose, max(1, requests), None, partial=True)
+
+    def _select(self, purpose: str, requests: int, exclude: Optional[ModelEndpoint],
+                partial: bool) -> Optional[Tuple[ModelEndpoint, int]]:
+        route = [endpoint for endpoint in self.routes[purpose] if endpoint is not exclude]
+        if not route:
+            return None
+
+        deadline = time.time() + ROUTER_MAX_QUOTA_WAIT
+        while True:
+            skipped = None
+            for endpoint in route:
+                available = endpoint.available(purpose)
+                if available is not None and available < (1 if partial else requests):
+                    skipped = skipped or "quota"
+                    continue
+                healthy, state = endpoint.health(purpose)
+                if not healthy:
+                    if not endpoint.claim_probe():
+                        skipped = skipped or state
+                        continue
+                    # A single call checks whether the model has recovered
+                    endpoint.reserve(purpose, 1)
+                    return self._decide(purpose, endpoint, "probe"), 1
+                granted = min(requests, available) if partial and available is not None else requests
+                endpoint.reserve(purpose, granted)
+                reason = "preferred" if skipped is None else f"failover_{skipped}"
+                return self._decide(purpose, endpoint, reason), granted
+
+            if purpose in INTERACTIVE_PURPOSES or exclude is not None or time.time() >= deadline:
+                break
+            time.sleep(0.5)
+
+        # Nothing healthy with quota left: go with the first choice rather than fail,
+        # one call at a time when the caller can split its work
+        endpoint = route[0]
+        granted = 1 if partial else requests
+        endpoint.reserve(purpose, granted)
+        return self._decide(purpose, endpoint, "exhausted"), granted
+
+    def invoke(self, purpose: str, call: Callable):
+        """
+        Runs `call(llm, callbacks)` on the selected model. Errors fail over to the next
+        model; for interactive purposes a slow first call is hedged with a backup one.
+        """
+        endpoint = self.select(purpose)
+        if purpose not in INTERACTIVE_PURPOSES or not self.hedge_after:
+            return self._with_failover(purpose, endpoint, call)
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            futures = {executor.submit(call, endpoint.llm, [endpoint.callback_for(purpose)]): endpoint}
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                backup = self.select(purpose, exclude=endpoint)
+                if backup is not None:
+                    self._decide(purpose, backup, "hedge")
+                    incr("model_hedges_total", purpose=purpose, model=backup.name)
+                    futures[executor.submit(call, backup.llm, [backup.callback_for(purpose)])] = backup
+
+            pending = set(futures)
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            # Every attempt failed; let the failover path try what is left
+            return self._with_failover(purpose, None, call, error=error, tried=set(futures.values()))
+        finally:
+            executor.shutdown(wait=False)
+
+    def _with_failover(self, purpose: str, endpoint: Optional[ModelEndpoint], call: Callable,
+                       error: Optional[BaseException] = None, tried: Optional[set] = None):
+        tried = set(tried or ())
+        if endpoint is not None:
+            try:
+                return call(endpoint.llm, [endpoint.callback_for(purpose)])
+            except Exception as e:
+                error = e
+                tried.add(endpoint)
+
+        while True:
+            backup = self._failover_to(purpose, tried, error)
+            try:
+                return call(backup.llm, [backup.callback_for(purpose)])
+            except Exception as e:
+                error = e
+                tried.add(backup)
+
+    def _failover_to(self, purpose: str, tried: set, error: BaseException) -> ModelEndpoint:
+        """
+        Picks and reserves the next untried model after `error`, or re-raises it when none is left.
+        """
+        backup = next((endpoint for endpoint in self.routes[purpose] if endpoint not in tried), None)
+        if backup is None:
+            raise error
+        print(f"Model call failed ({error}); failing over to {backup.name}")
+        incr("model_failovers_total", purpose=purpose, model=backup.name)
+        self._decide(purpose, backup, "failover_error")
+        backup.reserve(purpose)
+        return backup
+
+    def _hedge_to(self, purpose: str, tried: set, racing: bool) -> Optional[ModelEndpoint]:
+        """
+        Reserves an untried model to race (or, once nothing is racing, replace) the current one.
+        """
+        backup = next((candidate for candidate in self.routes[purpose] if candidate not in tried), None)
+        if backup is not None:
+            tried.add(backup)
+            backup.reserve(purpose)
+            self._decide(purpose, backup, "hedge" if racing else "failover_error")
+            incr("model_hedges_total" if racing else "model_failovers_total", purpose=purpose, model=backup.name)
+        return backup
+
+    async def ainvoke(self, purpose: str, call: Callable):
+        """
+        asyncio version of `invoke`: `call(llm, callbacks)` returns an awaitable. The losing
+        hedged request is cancelled rather than left running.
+        """
+        endpoint = self.select(purpose)
+        if purpose not in INTERACTIVE_PURPOSES or not self.hedge_after:
+            return await self._awith_failover(purpose, endpoint, call)
+
+        tasks = {asyncio.ensure_future(call(endpoint.llm, [endpoint.callback_for(purpose)])): endpoint}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                backup = self.select(purpose, exclude=endpoint)
+                if backup is not None:
+                    self._decide(purpose, backup, "hedge")
+                    incr("model_hedges_total", purpose=purpose, model=backup.name)
+                    tasks[asyncio.ensure_future(call(backup.llm, [backup.callback_for(purpose)]))] = backup
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            return await self._awith_failover(purpose, None, call, error=error, tried=set(tasks.values()))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _awith_failover(self, purpose: str, endpoint: Optional[ModelEndpoint], call: Callable,
+                              error: Optional[BaseException] = None, tried: Optional[set] = None):
+        tried = set(tried or ())
+        if endpoint is not None:
+            try:
+                return await call(endpoint.llm, [endpoint.callback_for(purpose)])
+            except Exception as e:
+                error = e
+                tried.add(endpoint)
+
+        while True:
+            backup = self._failover_to(purpose, tried, error)
+            try:
+                return await call(backup.llm, [backup.callback_for(purpose)])
+            except Exception as e:
+                error = e
+                tried.add(backup)
+
+    def stream(self, purpose: str, call: Callable) -> Iterator:
+        """
+        Streaming counterpart of `invoke`: `call(llm, callbacks)` returns an iterator. The
+        first model to produce a chunk wins; a backup starts when the first is silent for
+        `hedge_after` seconds or fails before its first chunk.
+        """
+        endpoint = self.select(purpose)
+        streams = [(endpoint, self._pump(call, endpoint, purpose))]
+        hedge_at = time.perf_counter() + self.hedge_after if self.hedge_after else None
+        tried = {endpoint}
+
+        while True:
+            for source, chunks in list(streams):
+                try:
+                    kind, value = chunks.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if kind == "chunk":
+                    yield value
+                    yield from self._drain(chunks)
+                    return
+                # Finished or failed before producing anything
+                streams.remove((source, chunks))
+                if kind == "done":
+                    return
+                print(f"Model stream failed on {source.name}: {value}")
+                hedge_at = time.perf_counter()
+                if not streams and all(backup in tried for backup in self.routes[purpose]):
+                    raise value
+
+            if hedge_at is not None and time.perf_counter() >= hedge_at:
+                hedge_at = None
+                backup = self._hedge_to(purpose, tried, racing=bool(streams))
+                if backup is not None:
+                    streams.append((backup, self._pump(call, backup, purpose)))
+
+    async def astream(self, purpose: str, call: Callable) -> AsyncIterator:
+        """
+        asyncio version of `stream`: `call(llm, callbacks)` returns an async iterator. Once a
+        model produces its first chunk the others are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: "asyncio.Queue" = asyncio.Queue()
+        endpoint = self.select(purpose)
+        tasks = {endpoint: asyncio.ensure_future(self._apump(call, endpoint, purpose, chunks))}
+        tried = {endpoint}
+        hedge_at = loop.time() + self.hedge_after if self.hedge_after else None
+        winner = None
+        error = None
+
+        try:
+            while True:
+                timeout = None if hedge_at is None else max(0.0, hedge_at - loop.time())
+                try:
+                    source, kind, value = await asyncio.wait_for(chunks.get(), timeout)
+                except asyncio.TimeoutError:
+                    hedge_at = None
+                    backup = self._hedge_to(purpose, tried, racing=bool(tasks))
+                    if backup is not None:
+                        tasks[backup] = asyncio.ensure_future(self._apump(call, backup, purpose, chunks))
+                    elif not tasks:
+                        raise error
+                    continue
+
+                if winner is not None:
+                    if source is not winner:
+                        continue
+                    if kind == "chunk":
+                        yield value
+                    elif kind == "done":
+                        return
+                    else:
+                        raise value
+                elif kind == "chunk":
+                    winner = source
+                    for other, task in tasks.items():
+                        if other is not winner:
+                            task.cancel()
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    # Failed before producing anything: try the next model right away
+                    print(f"Model stream failed on {source.name}: {value}")
+                    tasks.pop(source, None)
+                    error = value
+                    hedge_at = loop.time()
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    @staticmethod
+    async def _apump(call: Callable, endpoint: ModelEndpoint, purpose: str, chunks: "asyncio.Queue"):
+        try:
+            async for chunk in call(endpoint.llm, [endpoint.callback_for(purpose)]):
+                await chunks.put((endpoint, "chunk", chunk))
+            await chunks.put((endpoint, "done", None))
+        except Exception as e:
+            await chunks.put((endpoint, "error", e))
+
+    @staticmethod
+    def _pump(call: Callable, endpoint: ModelEndpoint, purpose: str) -> "queue.Queue":
+        """
+        Consumes a stream on a worker thread so several can be raced; the loser runs to completion unobserved.
+        """
+        chunks = queue.Queue()
+
+        def run():
+            try:
+                for chunk in call(endpoint.llm, [endpoint.callback_for(purpose)]):
+                    chunks.put(("chunk", chunk))
+                chunks.put(("done", None))
+            except Exception as e:
+                chunks.put(("error", e))
+
+        threading.Thread(target=run, daemon=True, name=f"stream-{endpoint.name}").start()
+        return chunks
+
+    @staticmethod
+    def _drain(chunks: "queue.Queue") -> Iterator:
+        while True:
+            kind, value = chunks.get()
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+
+    def stats(self) -> List[dict]:
+        """
+        Per-model quota use, health and the routing decisions taken so far.
+        """
+        with self._lock:
+            decisions = dict(self._decisions)
+        rows = []
+        for endpoint in self.endpoints():
+            row = endpoint.stats()
+            row["purposes"] = ", ".join(purpose for purpose, route in self.routes.items() if endpoint in route)
+            row["decisions"] = ", ".join(
+                f"{purpose}/{reason}={count}"
+                for (purpose, name, reason), count in sorted(decisions.items())
+                if name == endpoint.name
+            )
+            rows.append(row)
+        return rows
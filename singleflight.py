@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from metrics import incr
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Process-wide coalescing of identical in-flight work: the first caller for a key runs
+    the upstream call and every concurrent caller for that key waits for its result.
+    Nothing is kept once the call finishes; caching is left to the caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        """
+        Returns `fn()`, or the result of an identical call already in flight.
+        """
+        return self.do_many([key], lambda keys: {key: fn()})[key]
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[list], dict]) -> dict:
+        """
+        Resolves many keys at once. `fn` receives the keys nobody else is working on and
+        returns a dict for them; keys it leaves out resolve to None. Keys already in flight
+        elsewhere are waited for, so each key has at most one upstream call at a time.
+        """
+        owned, waiting = [], {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = _Call()
+                    owned.append(key)
+                else:
+                    waiting[key] = call
+
+        incr("singleflight_calls_total", len(owned), flight=self.name)
+        incr("singleflight_coalesced_total", len(waiting), flight=self.name)
+
+        results = {}
+        if owned:
+            try:
+                values = fn(owned) or {}
+            except BaseException as e:
+                self._finish(owned, {}, e)
+                raise
+            self._finish(owned, values, None)
+            results.update((key, values.get(key)) for key in owned)
+
+        for key, call in waiting.items():
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.value
+        return results
+
+    def _finish(self, keys: list, values: dict, error: Optional[BaseException]):
+        with self._lock:
+            calls = [self._calls.pop(key) for key in keys]
+        for key, call in zip(keys, calls):
+            call.value = values.get(key)
+            call.error = error
+            call.event.set()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight: coalesces identical in-flight work between tasks
+    of the same event loop. If the task doing the work is cancelled, its waiters do the
+    work themselves instead of failing with it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = \
+            weakref.WeakKeyDictionary()
+
+    def _loop_calls(self) -> Dict[Hashable, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        calls = self._calls.get(loop)
+        if calls is None:
+            calls = self._calls[loop] = {}
+        return calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        Returns `await fn()`, or the result of an identical call already in flight.
+        """
+        async def run(keys):
+            return {key: await fn()}
+
+        return (await self.do_many([key], run))[key]
+
+    async def do_many(self, keys: Iterable[Hashable], fn: Callable[[list], Awaitable[dict]]) -> dict:
+        """
+        Same contract as SingleFlight.do_many, with `fn` a coroutine function.
+        """
+        calls = self._loop_calls()
+        owned, waiting = [], {}
+        for key in dict.fromkeys(keys):
+            if key in calls:
+                waiting[key] = calls[key]
+            else:
+                owned.append(key)
+
+        incr("singleflight_calls_total", len(owned), flight=self.name)
+        incr("singleflight_coalesced_total", len(waiting), flight=self.name)
+
+        results = {}
+        if owned:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in owned}
+            calls.update(futures)
+            try:
+                values = await fn(owned) or {}
+            except BaseException as e:
+                self._finish(calls, futures, {}, e)
+                raise
+            self._finish(calls, futures, values, None)
+            results.update((key, values.get(key)) for key in owned)
+
+        retry = []
+        for key, future in waiting.items():
+            try:
+                # Shielded so a waiter being cancelled leaves the shared call running
+                results[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                retry.append(key)
+        if retry:
+            results.update(await self.do_many(retry, fn))
+        return results
+
+    @staticmethod
+    def _finish(calls: dict, futures: Dict[Hashable, asyncio.Future], values: dict,
+                error: Optional[BaseException]):
+        for key, future in futures.items():
+            if calls.get(key) is future:
+                del calls[key]
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+                # Nobody may be waiting; mark the error as retrieved
+                future.exception()
+            else:
+                future.set_result(values.get(key))
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Dict, List, Optional
+
+from cache import DEFAULT_CACHE_PATH
+
+# A saved library younger than this is shown without calling GetOwnedGames
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(6 * 3600)))
+# Playtime history kept per account for "what did I play lately" questions
+SNAPSHOT_HISTORY_DAYS = float(os.getenv("SNAPSHOT_HISTORY_DAYS", "35"))
+
+
+def diff_games(old_games: Optional[List[dict]], new_games: List[dict]) -> dict:
+    """
+    Compares two GetOwnedGames payloads. Returns {"new": [appid], "removed": [appid],
+    "playtime": {appid: minutes played in between}} with only positive deltas kept.
+    """
+    old = {int(game["appid"]): game.get("playtime_forever", 0) for game in old_games or []}
+    new = {int(game["appid"]): game.get("playtime_forever", 0) for game in new_games}
+    return {
+        "new": [app_id for app_id in new if app_id not in old],
+        "removed": [app_id for app_id in old if app_id not in new],
+        "playtime": {
+            app_id: minutes - old[app_id]
+            for app_id, minutes in new.items()
+            if app_id in old and minutes > old[app_id]
+        },
+    }
+
+
+class LibrarySnapshotStore:
+    """
+    Last GetOwnedGames result and classification labels per Steam ID, plus a slim
+    playtime history. Lives in the same SQLite file as the caches.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_CACHE_PATH
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS library_snapshots (
+                    steam_id TEXT PRIMARY KEY,
+                    taken_at REAL NOT NULL,
+                    games TEXT NOT NULL,
+                    labels TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS playtime_history (
+                    steam_id TEXT NOT NULL,
+                    taken_at REAL NOT NULL,
+                    playtime TEXT NOT NULL,
+                    PRIMARY KEY (steam_id, taken_at)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Commits on success like sqlite3's context manager, then closes the connection
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def load(self, steam_id: str) -> Optional[dict]:
+        """
+        Returns {"taken_at", "games", "labels"} for the last saved library, or None.
+        Labels map appid -> [genre, play_style, vibe].
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT taken_at, games, labels FROM library_snapshots WHERE steam_id = ?", (str(steam_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        labels = {int(app_id): value for app_id, value in json.loads(row[2]).items()}
+        return {"taken_at": row[0], "games": json.loads(row[1]), "labels": labels}
+
+    def save(self, steam_id: str, games: List[dict], labels: Dict[int, list]):
+        """
+        Replaces the saved library and appends its playtimes to the history.
+        """
+        now = time.time()
+        playtime = {str(game["appid"]): game.get("playtime_forever", 0) for game in games}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO library_snapshots (steam_id, taken_at, games, labels) VALUES (?, ?, ?, ?)",
+                (str(steam_id), now, json.dumps(games, ensure_ascii=False),
+                 json.dumps({str(app_id): value for app_id, value in labels.items()}, ensure_ascii=False))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO playtime_history (steam_id, taken_at, playtime) VALUES (?, ?, ?)",
+                (str(steam_id), now, json.dumps(playtime))
+            )
+            conn.execute(
+                "DELETE FROM playtime_history WHERE steam_id = ? AND taken_at < ?",
+                (str(steam_id), now - SNAPSHOT_HISTORY_DAYS * 86400)
+            )
+
+    def save_labels(self, steam_id: str, labels: Dict[int, list]):
+        """
+        Updates the labels of the saved library without touching its games or timestamp.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE library_snapshots SET labels = ? WHERE steam_id = ?",
+                (json.dumps({str(app_id): value for app_id, value in labels.items()}, ensure_ascii=False), str(steam_id))
+            )
+
+    def playtime_since(self, steam_id: str, since: float) -> Dict[int, int]:
+        """
+        Minutes played per appid between the last history entry at or before `since`
+        (or the oldest one after it) and the latest entry. Empty with fewer than two entries.
+        """
+        with self._connect() as conn:
+            base = conn.execute(
+                "SELECT playtime FROM playtime_history WHERE steam_id = ? AND taken_at <= ? "
+                "ORDER BY taken_at DESC LIMIT 1",
+                (str(steam_id), since)
+            ).fetchone() or conn.execute(
+                "SELECT playtime FROM playtime_history WHERE steam_id = ? ORDER BY taken_at ASC LIMIT 1",
+                (str(steam_id),)
+            ).fetchone()
+            latest = conn.execute(
+                "SELECT playtime FROM playtime_history WHERE steam_id = ? ORDER BY taken_at DESC LIMIT 1",
+                (str(steam_id),)
+            ).fetchone()
+        if base is None or latest is None:
+            return {}
+
+        before, after = json.loads(base[0]), json.loads(latest[0])
+        return {
+            int(app_id): minutes - before.get(app_id, 0)
+            for app_id, minutes in after.items()
+            if minutes > before.get(app_id, 0) and app_id in before
+        }
@@ -1,10 +1,290 @@
 import os
+import random
+import asyncio
+import weakref
+import httpx
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, TimeoutError as FuturesTimeoutError
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from cache import SqliteCache
+from metrics import span, incr
+from singleflight import SingleFlight, AsyncSingleFlight
 
 load_dotenv()
 
+HTTP_POOL_SIZE = int(os.getenv("STEAM_HTTP_POOL_SIZE", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("STEAM_HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_BASE = float(os.getenv("STEAM_HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("STEAM_HTTP_BACKOFF_MAX", "30"))
+
+# (requests per second, burst) per host. The Store API allows roughly 200 calls per 5 minutes.
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "api.steampowered.com": (float(os.getenv("STEAM_WEB_API_RATE", "10")), 20),
+    "store.steampowered.com": (float(os.getenv("STEAM_STORE_API_RATE", "0.66")), 10),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+STORE_DETAILS_URL = "https://store.steampowered.com/api/appdetails"
+# Store metadata rarely changes; apps without a store page are rechecked sooner
+STORE_DETAILS_TTL = int(os.getenv("STORE_DETAILS_CACHE_TTL", str(7 * 24 * 3600)))
+STORE_DETAILS_MISSING_TTL = int(os.getenv("STORE_DETAILS_MISSING_TTL", str(24 * 3600)))
+STORE_DETAILS_MAX_ENTRIES = int(os.getenv("STORE_DETAILS_CACHE_MAX_ENTRIES", "50000"))
+# appdetails fields kept in the cache; the rest (descriptions, media, requirements) is dropped
+STORE_DETAIL_FIELDS = ("steam_appid", "name", "type", "genres", "categories")
+STORE_DETAILS_WORKERS = int(os.getenv("STORE_DETAILS_WORKERS", "4"))
+# Apps fetched per background prefetch run; the rest wait for the next run
+STORE_PREFETCH_BATCH = int(os.getenv("STORE_PREFETCH_BATCH", "200"))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `penalize` blocks every caller until a server-imposed
+    cool-down (e.g. Retry-After) has passed.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_acquire(self) -> float:
+        """
+        Takes a token if one is available. Returns 0, or how long to wait before trying again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self):
+        # Same bucket as the threaded callers, so sync and async traffic share one limit
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, delay: float):
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = 0.0
+            self.updated = now
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host: str) -> TokenBucket:
+    """
+    The process-wide token bucket for `host`, created from RATE_LIMITS on first use.
+    """
+    with _buckets_lock:
+        if host not in _buckets:
+            rate, capacity = RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            _buckets[host] = TokenBucket(rate, capacity)
+        return _buckets[host]
+
+
+class SteamHttpClient:
+    """
+    Pooled HTTP client shared by all Steam calls: keep-alive connections, a token
+    bucket per host, and exponential backoff with jitter on throttling and transient errors.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = HTTP_BACKOFF_BASE, backoff_max: float = HTTP_BACKOFF_MAX):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _retry_delay(self, host: str, bucket: TokenBucket, status: int, retry_after: Optional[str],
+                     attempt: int) -> Optional[float]:
+        """
+        Counts a response and returns how long to wait before retrying it, or None to return it.
+        """
+        incr("steam_http_requests_total", host=host, status=status)
+        if status not in RETRY_STATUSES or attempt == self.max_retries:
+            return None
+
+        delay = _parse_retry_after(retry_after)
+        if delay is None:
+            delay = self._backoff(attempt)
+        if status == 429:
+            # Slow down every caller hitting this host, not just this one, but never
+            # for longer than our own backoff cap
+            bucket.penalize(min(delay, self.backoff_max))
+        if delay > self.backoff_max:
+            # Holding a request (and a worker) for a long Retry-After is worse than
+            # handing the error back to the caller
+            return None
+
+        incr("steam_http_retries_total", host=host)
+        return delay
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: float = 10,
+            headers: Optional[dict] = None) -> requests.Response:
+        """
+        Issues a rate-limited GET. Throttled or failed requests are retried; once
+        retries are exhausted the last response is returned (or the last error raised).
+        """
+        host = urlparse(url).hostname or ""
+        bucket = get_bucket(host)
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, headers=headers)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                incr("steam_http_errors_total", host=host, error=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                incr("steam_http_retries_total", host=host)
+                time.sleep(self._backoff(attempt))
+                continue
+
+            delay = self._retry_delay(host, bucket, response.status_code, response.headers.get("Retry-After"), attempt)
+            if delay is None:
+                return response
+            time.sleep(delay)
+
+        return response
+
+
+class AsyncSteamHttpClient(SteamHttpClient):
+    """
+    asyncio counterpart of SteamHttpClient on a pooled httpx.AsyncClient. Rate limits,
+    retries and backoff are the same and the per-host buckets are shared with the sync client.
+    An httpx client belongs to one event loop, so use `get_async_client()` rather than sharing instances.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = HTTP_BACKOFF_BASE, backoff_max: float = HTTP_BACKOFF_MAX):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def get(self, url: str, params: Optional[dict] = None, timeout: float = 10,
+                  headers: Optional[dict] = None) -> httpx.Response:
+        """
+        Issues a rate-limited GET. Throttled or failed requests are retried; once
+        retries are exhausted the last response is returned (or the last error raised).
+        Cancelling the caller cancels the request, including any backoff wait.
+        """
+        host = urlparse(url).hostname or ""
+        bucket = get_bucket(host)
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.aacquire()
+            try:
+                response = await self.session.get(url, params=params, timeout=timeout, headers=headers)
+            except httpx.TransportError as e:
+                incr("steam_http_errors_total", host=host, error=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                incr("steam_http_retries_total", host=host)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            delay = self._retry_delay(host, bucket, response.status_code, response.headers.get("Retry-After"), attempt)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+        return response
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+_client = SteamHttpClient()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSteamHttpClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> SteamHttpClient:
+    return _client
+
+
+def get_async_client() -> AsyncSteamHttpClient:
+    """
+    The async client for the running event loop, created on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncSteamHttpClient()
+    return client
+
+
+async def aclose_async_client():
+    """
+    Closes the running loop's async client, e.g. on web server shutdown.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# Concurrent refreshes of the same library (e.g. several tabs) share one GetOwnedGames call
+_owned_games_flight = SingleFlight("owned_games")
+_owned_games_aflight = AsyncSingleFlight("owned_games")
+
+OWNED_GAMES_URL = "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+
+
 def get_owned_games(steam_id: str):
     """
     Fetches the list of owned games for a given Steam ID.
@@ -15,8 +295,26 @@ def get_owned_games(steam_id: str):
         print("STEAM_API_KEY is not set.")
         return None
 
-    url = "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
-    params = {
+    games = _owned_games_flight.do((api_key, str(steam_id)), lambda: _fetch_owned_games(api_key, steam_id))
+    # Every waiter gets its own list; the game dicts themselves are shared and treated as read-only
+    return list(games) if games is not None else None
+
+
+async def aget_owned_games(steam_id: str):
+    """
+    Async version of get_owned_games. Concurrent calls on the same event loop share one request.
+    """
+    api_key = os.getenv("STEAM_API_KEY")
+    if not api_key:
+        print("STEAM_API_KEY is not set.")
+        return None
+
+    games = await _owned_games_aflight.do((api_key, str(steam_id)), lambda: _afetch_owned_games(api_key, steam_id))
+    return list(games) if games is not None else None
+
+
+def _owned_games_params(api_key: str, steam_id: str) -> dict:
+    return {
         "key": api_key,
         "steamid": steam_id,
         "format": "json",
@@ -24,41 +322,382 @@ def get_owned_games(steam_id: str):
         "include_played_free_games": "1"
     }
 
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if "response" in data and "games" in data["response"]:
-            return data["response"]["games"]
-        else:
-            return []
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching games: {e}")
-        return None
 
-def get_game_details(app_id: int):
+def _parse_owned_games(data: dict, attributes: dict) -> list:
+    if "response" in data and "games" in data["response"]:
+        attributes["games"] = len(data["response"]["games"])
+        return data["response"]["games"]
+    return []
+
+
+def _fetch_owned_games(api_key: str, steam_id: str):
+    with span("steam.get_owned_games") as attributes:
+        try:
+            response = _client.get(OWNED_GAMES_URL, params=_owned_games_params(api_key, steam_id), timeout=10)
+            response.raise_for_status()
+            return _parse_owned_games(response.json(), attributes)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching games: {e}")
+            attributes["failed"] = True
+            return None
+
+
+async def _afetch_owned_games(api_key: str, steam_id: str):
+    with span("steam.get_owned_games") as attributes:
+        try:
+            response = await get_async_client().get(OWNED_GAMES_URL, params=_owned_games_params(api_key, steam_id),
+                                                    timeout=10)
+            response.raise_for_status()
+            return _parse_owned_games(response.json(), attributes)
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error fetching games: {e}")
+            attributes["failed"] = True
+            return None
+
+
+_store_cache = None
+_store_cache_lock = threading.Lock()
+
+
+def _get_store_cache() -> Optional[SqliteCache]:
+    global _store_cache
+    with _store_cache_lock:
+        if _store_cache is None:
+            try:
+                # Entries carry their own expiry so stale ones can be refreshed conditionally
+                _store_cache = SqliteCache("store_details", max_entries=STORE_DETAILS_MAX_ENTRIES)
+            except Exception as e:
+                print(f"Warning: store details cache unavailable: {e}")
+        return _store_cache
+
+
+def _store_request(app_id: int, cached: Optional[dict]) -> Tuple[dict, Optional[dict]]:
     """
-    Fetches details for a specific game from the Steam Store API.
-    Note: strict rate limits apply.
+    Query parameters and conditional headers for one Store API request.
     """
-    url = "https://store.steampowered.com/api/appdetails"
     params = {
         "appids": app_id,
         "l": "koreana" # Request Korean data if available
     }
-    
-    try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code == 429:
-            print("Rate limit exceeded for Store API")
-            time.sleep(2) # Simple backoff
-            return None
-            
-        data = response.json()
-        if data and str(app_id) in data and data[str(app_id)]["success"]:
-            return data[str(app_id)]["data"]
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return params, headers or None
+
+
+def _trim_details(details: dict) -> dict:
+    """
+    Keeps only the appdetails fields the app reads: name, type and the genre and category ids.
+    """
+    trimmed = {field: details[field] for field in STORE_DETAIL_FIELDS if field in details}
+    for field in ("genres", "categories"):
+        if field in trimmed:
+            trimmed[field] = [
+                {"id": entry.get("id"), "description": entry.get("description")}
+                for entry in trimmed[field] or [] if isinstance(entry, dict)
+            ]
+    return trimmed
+
+
+def _store_entry(app_id: int, response, cached: Optional[dict], attributes: dict) -> Optional[dict]:
+    """
+    Turns a Store API response (requests or httpx) into a cache entry, or None when throttled.
+    """
+    now = time.time()
+    attributes["status"] = response.status_code
+    if response.status_code == 304 and cached:
+        # Entries cached before trimming shrink on their next revalidation
+        details = _trim_details(cached["data"]) if cached.get("data") else cached.get("data")
+        return {**cached, "data": details, "expires_at": now + STORE_DETAILS_TTL}
+    if response.status_code == 429:
+        print(f"Rate limit exceeded for Store API (app {app_id}), retries exhausted")
         return None
+
+    data = response.json()
+    details = None
+    if data and str(app_id) in data and data[str(app_id)]["success"]:
+        details = _trim_details(data[str(app_id)]["data"])
+
+    ttl = STORE_DETAILS_TTL if details is not None else STORE_DETAILS_MISSING_TTL
+    return {
+        "data": details,
+        "expires_at": now + ttl,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def _fetch_store_entry(app_id: int, cached: Optional[dict] = None) -> Optional[dict]:
+    """
+    Fetches one app from the Store API, caches it and returns the cache entry, or None on failure.
+    A stale cached entry is revalidated with its ETag / Last-Modified validators.
+    Caching happens here, on the worker, so a result arriving after the caller gave up is still kept.
+    """
+    params, headers = _store_request(app_id, cached)
+    with span("steam.get_game_details", app_id=app_id) as attributes:
+        try:
+            response = _client.get(STORE_DETAILS_URL, params=params, timeout=5, headers=headers)
+            entry = _store_entry(app_id, response, cached, attributes)
+        except Exception as e:
+            print(f"Error fetching details for app {app_id}: {e}")
+            attributes["failed"] = True
+            return None
+    _cache_store_entry(app_id, entry)
+    return entry
+
+
+async def _afetch_store_entry(app_id: int, cached: Optional[dict] = None) -> Optional[dict]:
+    params, headers = _store_request(app_id, cached)
+    with span("steam.get_game_details", app_id=app_id) as attributes:
+        try:
+            response = await get_async_client().get(STORE_DETAILS_URL, params=params, timeout=5, headers=headers)
+            entry = _store_entry(app_id, response, cached, attributes)
+        except Exception as e:
+            print(f"Error fetching details for app {app_id}: {e}")
+            attributes["failed"] = True
+            return None
+    await asyncio.to_thread(_cache_store_entry, app_id, entry)
+    return entry
+
+
+def _cache_store_entry(app_id: int, entry: Optional[dict]):
+    cache = _get_store_cache()
+    if entry is None or cache is None:
+        return
+    try:
+        cache.set(str(app_id), entry)
     except Exception as e:
-        print(f"Error fetching details for app {app_id}: {e}")
+        print(f"Error writing store details cache: {e}")
+
+
+# Store requests left running after their caller stopped waiting; kept referenced until they finish
+_detached_fetches: set = set()
+
+
+def get_game_details_bulk(app_ids: Iterable[int], max_workers: Optional[int] = None,
+                          timeout: Optional[float] = None) -> Iterator[Tuple[int, Optional[dict]]]:
+    """
+    Yields (app_id, details) pairs as they become available: fresh cache hits first,
+    then misses fetched concurrently under the Store API rate limit.
+    `details` is None for apps without store data. Fetching stops after `timeout` seconds.
+    """
+    ids = list(dict.fromkeys(int(app_id) for app_id in app_ids))
+    fresh, to_fetch = _split_store_cache(ids, _read_store_cache(_get_store_cache(), ids))
+    yield from fresh
+    if not to_fetch:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or STORE_DETAILS_WORKERS)
+    futures = {executor.submit(_fetch_store_entry, app_id, entry): (app_id, entry) for app_id, entry in to_fetch}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            app_id, stale = futures[future]
+            yield _store_result(app_id, future.result(), stale)
+    except FuturesTimeoutError:
+        print(f"Store details prefetch timed out after {timeout}s")
+        incr("store_details_prefetch_timeouts_total")
+    finally:
+        # Queued requests are dropped; running ones finish and cache their result
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aget_game_details_bulk(app_ids: Iterable[int], max_workers: Optional[int] = None,
+                                 timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """
+    Async version of get_game_details_bulk: at most `max_workers` requests in flight on the
+    event loop instead of a thread pool. After `timeout` seconds, or when the caller stops
+    iterating, requests still waiting for a slot are cancelled; running ones finish and are cached.
+    """
+    ids = list(dict.fromkeys(int(app_id) for app_id in app_ids))
+    fresh, to_fetch = _split_store_cache(ids, await asyncio.to_thread(_read_store_cache, _get_store_cache(), ids))
+    for item in fresh:
+        yield item
+    if not to_fetch:
+        return
+
+    slots = asyncio.Semaphore(max_workers or STORE_DETAILS_WORKERS)
+    started = set()
+
+    async def fetch(app_id, entry):
+        async with slots:
+            started.add(app_id)
+            return app_id, entry, await _afetch_store_entry(app_id, entry)
+
+    tasks = {asyncio.ensure_future(fetch(app_id, entry)): app_id for app_id, entry in to_fetch}
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=timeout):
+            app_id, stale, entry = await next_done
+            yield _store_result(app_id, entry, stale)
+    except asyncio.TimeoutError:
+        print(f"Store details prefetch timed out after {timeout}s")
+        incr("store_details_prefetch_timeouts_total")
+    finally:
+        for task, app_id in tasks.items():
+            if task.done():
+                continue
+            if app_id in started:
+                _detached_fetches.add(task)
+                task.add_done_callback(_detached_fetches.discard)
+            else:
+                task.cancel()
+
+
+def cached_game_details(app_ids: Iterable[int]) -> Tuple[Dict[int, Optional[dict]], list]:
+    """
+    Returns ({app_id: details} already in the store cache, app ids that are missing or expired)
+    without calling the Store API. Expired entries are still returned, since store metadata
+    rarely changes; pass the second list to `prefetch_game_details` to refresh them.
+    """
+    ids = list(dict.fromkeys(int(app_id) for app_id in app_ids))
+    cached = _read_store_cache(_get_store_cache(), ids)
+    now = time.time()
+    found = {app_id: cached[str(app_id)]["data"] for app_id in ids if str(app_id) in cached}
+    to_fetch = [app_id for app_id in ids if app_id not in found or cached[str(app_id)].get("expires_at", 0) <= now]
+    incr("cache_hits_total", len(found), cache="store_details_cached_only")
+    incr("cache_misses_total", len(ids) - len(found), cache="store_details_cached_only")
+    return found, to_fetch
+
+
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+# Queued app id -> callbacks to notify once it has been fetched
+_prefetch_queued: Dict[int, set] = {}
+_prefetch_futures: set = set()
+_prefetch_lock = threading.Lock()
+
+
+def prefetch_game_details(app_ids: Iterable[int],
+                          on_fetched: Optional[Callable[[Dict[int, dict]], None]] = None) -> int:
+    """
+    Queues a background Store API fetch for apps not already queued, so later callers find
+    them in the cache. Runs one bulk fetch at a time, at the shared Store API rate.
+    `on_fetched` is called from the prefetch thread with {app_id: details} for the apps
+    that got store data, including ones already queued by another caller.
+    Returns how many apps were queued.
+    """
+    global _prefetch_executor
+    with _prefetch_lock:
+        ids = []
+        for app_id in dict.fromkeys(int(app_id) for app_id in app_ids):
+            if app_id not in _prefetch_queued:
+                _prefetch_queued[app_id] = set()
+                ids.append(app_id)
+            if on_fetched is not None:
+                _prefetch_queued[app_id].add(on_fetched)
+        if not ids:
+            return 0
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-prefetch")
+        for start in range(0, len(ids), STORE_PREFETCH_BATCH):
+            future = _prefetch_executor.submit(_run_prefetch, ids[start:start + STORE_PREFETCH_BATCH])
+            _prefetch_futures.add(future)
+            future.add_done_callback(_prefetch_futures.discard)
+    incr("store_details_prefetch_queued_total", len(ids))
+    return len(ids)
+
+
+def wait_for_prefetch(timeout: Optional[float] = None) -> bool:
+    """
+    Blocks until every queued prefetch has finished. Returns False if `timeout` ran out first.
+    """
+    with _prefetch_lock:
+        futures = list(_prefetch_futures)
+    _, not_done = wait(futures, timeout=timeout)
+    return not not_done
+
+
+def _run_prefetch(app_ids: list):
+    fetched = {}
+    try:
+        with span("steam.prefetch_game_details", apps=len(app_ids)):
+            for app_id, details in get_game_details_bulk(app_ids):
+                if details is not None:
+                    fetched[app_id] = details
+    except RuntimeError as e:
+        # Batches still queued at interpreter exit can no longer start fetch threads;
+        # their apps are simply fetched on the next run
+        if "shutdown" not in str(e):
+            print(f"Error prefetching store details: {e}")
+    except Exception as e:
+        print(f"Error prefetching store details: {e}")
+    finally:
+        callbacks: Dict[Callable, Dict[int, dict]] = {}
+        with _prefetch_lock:
+            for app_id in app_ids:
+                for callback in _prefetch_queued.pop(app_id, ()):
+                    details = callbacks.setdefault(callback, {})
+                    if app_id in fetched:
+                        details[app_id] = fetched[app_id]
+
+    for callback, details in callbacks.items():
+        if not details:
+            continue
+        try:
+            callback(details)
+        except Exception as e:
+            print(f"Error handling prefetched store details: {e}")
+
+
+def _read_store_cache(cache: Optional[SqliteCache], ids: list) -> dict:
+    if cache is None:
+        return {}
+    try:
+        return cache.get_many([str(app_id) for app_id in ids])
+    except Exception as e:
+        print(f"Error reading store details cache: {e}")
+        return {}
+
+
+def _split_store_cache(ids: list, cached: dict) -> Tuple[list, list]:
+    """
+    Splits ids into fresh (app_id, details) hits and (app_id, stale entry or None) to fetch.
+    """
+    now = time.time()
+    fresh, to_fetch = [], []
+    for app_id in ids:
+        entry = cached.get(str(app_id))
+        if entry and entry.get("expires_at", 0) > now:
+            fresh.append((app_id, entry["data"]))
+        else:
+            to_fetch.append((app_id, entry))
+
+    incr("cache_hits_total", len(fresh), cache="store_details")
+    incr("cache_misses_total", len(to_fetch), cache="store_details")
+    return fresh, to_fetch
+
+
+def _store_result(app_id: int, fresh: Optional[dict], stale: Optional[dict]) -> Tuple[int, Optional[dict]]:
+    """
+    Returns (app_id, details) for a fetched (already cached) entry, falling back to the stale entry.
+    """
+    if fresh is not None:
+        return app_id, fresh["data"]
+
+    # Serve stale data rather than nothing when the refresh failed
+    if stale:
+        incr("store_details_stale_served_total")
+    return app_id, stale["data"] if stale else None
+
+
+def get_game_details(app_id: int):
+    """
+    Fetches details for a specific game from the Steam Store API.
+    Note: strict rate limits apply; results are cached and requests are throttled by the shared client.
+    """
+    for _, details in get_game_details_bulk([app_id]):
+        return details
+    return None
+
+
+async def aget_game_details(app_id: int):
+    """
+    Async version of get_game_details.
+    """
+    results = aget_game_details_bulk([app_id])
+    try:
+        async for _, details in results:
+            return details
         return None
+    finally:
+        await results.aclose()
@@ -0,0 +1,72 @@
+from typing import Optional
+
+# Steam store genre ids -> English labels (descriptions are localized, ids are stable).
+# Tag-like genres (Indie, Free to Play, Early Access, ...) are only used when nothing better exists.
+STORE_GENRES = {
+    "1": "Action",
+    "2": "Strategy",
+    "3": "RPG",
+    "4": "Casual",
+    "9": "Racing",
+    "18": "Sports",
+    "25": "Adventure",
+    "28": "Simulation",
+    "29": "MMO",
+}
+SECONDARY_GENRES = {
+    "23": "Indie",
+    "37": "Free to Play",
+    "70": "Early Access",
+}
+
+# Labels the LLM picks from, so its answers share the store-derived vocabulary
+GENRE_LABELS = list(STORE_GENRES.values())
+PLAY_STYLE_LABELS = ["Single-player", "Multiplayer", "Single-player, Multiplayer", "Co-op"]
+
+# Steam store category ids used to derive the play style
+CATEGORY_SINGLE_PLAYER = {"2"}
+CATEGORY_CO_OP = {"9", "38", "39", "48"}
+CATEGORY_MULTIPLAYER = {"1", "20", "27", "36", "37", "47", "49"}
+
+
+def _ids(entries) -> list:
+    return [str(entry.get("id")) for entry in entries or [] if isinstance(entry, dict)]
+
+
+def genre_from_store(details: dict) -> Optional[str]:
+    genre_ids = _ids(details.get("genres"))
+    for genre_id in genre_ids:
+        if genre_id in STORE_GENRES:
+            return STORE_GENRES[genre_id]
+    for genre_id in genre_ids:
+        if genre_id in SECONDARY_GENRES:
+            return SECONDARY_GENRES[genre_id]
+    return None
+
+
+def play_style_from_store(details: dict) -> Optional[str]:
+    category_ids = set(_ids(details.get("categories")))
+    if category_ids & CATEGORY_CO_OP:
+        return "Co-op"
+    if category_ids & CATEGORY_MULTIPLAYER:
+        if category_ids & CATEGORY_SINGLE_PLAYER:
+            return "Single-player, Multiplayer"
+        return "Multiplayer"
+    if category_ids & CATEGORY_SINGLE_PLAYER:
+        return "Single-player"
+    return None
+
+
+def classify_from_store(details: Optional[dict]) -> Optional[dict]:
+    """
+    Derives genre and play style from Store API metadata.
+    Returns None unless both fields can be inferred; vibe is always left to the LLM.
+    """
+    if not details:
+        return None
+
+    genre = genre_from_store(details)
+    play_style = play_style_from_store(details)
+    if not genre or not play_style:
+        return None
+    return {"genre": genre, "play_style": play_style}
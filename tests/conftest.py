@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep test data out of the real cache; must be set before the app modules are imported
+os.environ["CACHE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="shelf-test-"), "test.db")
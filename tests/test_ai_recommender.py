@@ -0,0 +1,176 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import ai_recommender
+from ai_recommender import AIRecommender
+from cache import SqliteCache
+
+ACTION_SINGLE = {"genres": [{"id": "1"}], "categories": [{"id": 2}]}
+
+
+@pytest.fixture
+def ai(tmp_path):
+    recommender = AIRecommender(llm=FakeListChatModel(responses=["ok"]))
+    recommender.classification_cache = SqliteCache("classifications", path=str(tmp_path / "cache.db"))
+    recommender.response_cache = SqliteCache("responses", path=str(tmp_path / "cache.db"))
+    return recommender
+
+
+def test_prefetched_store_data_upgrades_cached_classifications(ai):
+    key = ai._classification_key(10)
+    ai.classification_cache.set(key, {"game_name": "Doom", "genre": "FPS", "play_style": "Solo", "vibe": "Fast"})
+
+    ai._upgrade_classifications({10: ACTION_SINGLE, 20: ACTION_SINGLE})
+
+    # The LLM vibe is kept; apps that were never classified are not added
+    assert ai.classification_cache.get(key) == {
+        "game_name": "Doom", "genre": "Action", "play_style": "Single-player", "vibe": "Fast"
+    }
+    assert ai.classification_cache.get(ai._classification_key(20)) is None
+
+
+def test_store_data_arriving_during_the_llm_call_wins(ai, monkeypatch):
+    monkeypatch.setattr(ai_recommender, "cached_game_details", lambda ids: ({10: ACTION_SINGLE, 20: None}, []))
+    games = [
+        {"app_id": 10, "genre": "FPS", "play_style": "Solo", "vibe": "Fast"},
+        {"app_id": 20, "genre": "Puzzle", "play_style": "Solo", "vibe": "Calm"},
+    ]
+
+    assert ai._late_store_fields(games) == [
+        {"app_id": 10, "genre": "Action", "play_style": "Single-player", "vibe": "Fast"},
+        {"app_id": 20, "genre": "Puzzle", "play_style": "Solo", "vibe": "Calm"},
+    ]
+
+
+CHUNK = [(1, "Doom"), (2, "Quake"), (3, "Portal"), (4, "Hades")]
+
+
+def test_failed_chunks_are_retried_then_bisected(ai, monkeypatch):
+    monkeypatch.setattr(ai_recommender, "CLASSIFY_MAX_RETRIES", 1)
+    games = []
+
+    retry = ai._collect_round([(CHUNK, 0)], [ValueError("bad json")], True, games)
+    assert retry == [(CHUNK, 1)]
+
+    retry = ai._collect_round(retry, [ValueError("bad json")], True, games)
+    assert retry == [(CHUNK[:2], 0), (CHUNK[2:], 0)]
+
+    # A single game that keeps failing is dropped
+    assert ai._collect_round([(CHUNK[:1], 1)], [ValueError("bad json")], True, games) == []
+    assert games == []
+
+
+def test_games_left_out_of_an_answer_are_requeued(ai):
+    answer = {"games": [
+        {"app_id": "1", "genre": "Action", "play_style": "Single-player", "vibe": "Fast"},
+        {"app_id": 99, "genre": "RPG", "play_style": "Co-op", "vibe": "Calm"},
+        {"app_id": 3, "genre": "Casual", "play_style": "Single-player", "vibe": "Clever"},
+    ]}
+    games = []
+
+    retry = ai._collect_round([(CHUNK, 0)], [answer], True, games)
+
+    # Unknown app ids are ignored and results take the library's names
+    assert [(game["app_id"], game["game_name"]) for game in games] == [(1, "Doom"), (3, "Portal")]
+    assert retry == [([(2, "Quake"), (4, "Hades")], 1)]
+
+
+def chat(memory, turns, start=0):
+    for turn in range(start, start + turns):
+        memory.save_context({"question": f"q{turn}"}, {"output": f"a{turn}"})
+    future = memory._summary_future
+    if future is not None:
+        future.result(timeout=5)
+
+
+def test_memory_trims_to_half_the_window_and_summarizes_in_the_background():
+    calls = []
+
+    def summarizer(summary, messages):
+        calls.append([message.content for message in messages])
+        return f"{summary}+{len(messages)}"
+
+    memory = ai_recommender.SimpleMemory(max_messages=8, token_budget=10_000, summarizer=summarizer)
+    chat(memory, 4)
+    assert calls == []
+
+    # The fifth turn overflows the window: the history drops to 4 messages in one go
+    chat(memory, 1, start=4)
+    assert calls == [["q0", "a0", "q1", "a1", "q2", "a2"]]
+    assert [message.content for message in memory.chat_history] == ["q3", "a3", "q4", "a4"]
+    assert memory.summary == "+6"
+
+    # ...so the next turns do not call the summarizer again until the window is full
+    chat(memory, 2, start=5)
+    assert len(calls) == 1
+
+
+def test_messages_waiting_for_a_summary_stay_in_the_history():
+    release = ai_recommender.threading.Event()
+
+    def summarizer(summary, messages):
+        release.wait(5)
+        return "summary"
+
+    memory = ai_recommender.SimpleMemory(max_messages=4, token_budget=10_000, summarizer=summarizer)
+    for turn in range(3):
+        memory.save_context({"question": f"q{turn}"}, {"output": f"a{turn}"})
+
+    variables = memory.load_memory_variables({})
+    assert [message.content for message in variables["chat_history"]] == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    assert variables["conversation_summary"] == "(none)"
+
+    release.set()
+    memory._summary_future.result(timeout=5)
+    variables = memory.load_memory_variables({})
+    assert [message.content for message in variables["chat_history"]] == ["q2", "a2"]
+    assert variables["conversation_summary"] == "summary"
+
+
+def test_session_store_evicts_idle_and_least_recently_used_sessions(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(ai_recommender.time, "monotonic", lambda: clock[0])
+    store = ai_recommender.SessionMemoryStore(max_sessions=2, idle_ttl=100)
+
+    first = store.get("a")
+    store.get("b")
+    assert store.get("a") is first
+
+    # "b" is now the least recently used session and goes first when "c" arrives
+    store.get("c")
+    assert len(store) == 2 and store.get("a") is first and "b" not in store._sessions
+
+    clock[0] = 150
+    store.get("d")
+    assert set(store._sessions) == {"d"}
+
+
+def test_name_only_results_reach_every_app_with_that_name(ai):
+    misses = {10: "Doom", 20: "Doom", 30: "Quake"}
+    miss_keys = {app_id: ai._classification_key(app_id) for app_id in misses}
+    items = [
+        {"game_name": "Doom", "genre": "Action", "play_style": "Single-player", "vibe": "Fast"},
+        {"app_id": 30, "game_name": "Quake", "genre": "Action", "play_style": "Multiplayer"},
+    ]
+
+    results, to_store = ai._owned_results(items, misses, miss_keys)
+
+    assert set(results) == set(miss_keys.values())
+    assert results[miss_keys[10]] is results[miss_keys[20]]
+    # Partial results are returned but not cached
+    assert set(to_store) == {miss_keys[10], miss_keys[20]}
+
+
+def test_results_for_apps_owned_by_another_caller_are_ignored(ai):
+    misses = {10: "Doom"}
+    miss_keys = {10: ai._classification_key(10)}
+    items = [
+        {"app_id": 10, "game_name": "Doom", "genre": "Action", "play_style": "Solo", "vibe": "Fast"},
+        {"app_id": 10, "game_name": "Doom", "genre": "RPG", "play_style": "Solo", "vibe": "Slow"},
+        {"app_id": 20, "game_name": "Doom", "genre": "RPG", "play_style": "Solo", "vibe": "Slow"},
+    ]
+
+    results, _ = ai._owned_results(items, misses, miss_keys)
+
+    # The first answer for a key wins
+    assert results == {miss_keys[10]: items[0]}
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import background
+from background import ClassificationJob, _ChunkScheduler
+
+
+class RecordingAI:
+    """
+    Records which job each chunk belongs to; chunks of the bulk job block until released.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def classify_games(self, names, app_ids=None):
+        with self.lock:
+            self.calls.append(names[0].split("-")[0])
+        if names[0].startswith("bulk"):
+            self.release.wait(5)
+        if names[0].endswith("bad"):
+            raise ValueError("model unavailable")
+        return {"games": [{"app_id": app_id, "genre": "Action"} for app_id in app_ids]}
+
+
+def make_job(ai, prefix, count, scheduler, chunk_size=2):
+    names = [f"{prefix}-{i}" for i in range(count)]
+    return ClassificationJob(ai, names, list(range(count)), list(range(count)), chunk_size=chunk_size,
+                             scheduler=scheduler)
+
+
+def wait_done(job):
+    finished = []
+    for _ in range(500):
+        finished.extend(job.drain())
+        if job.done:
+            return finished
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_a_bulk_job_does_not_block_a_small_one():
+    ai = RecordingAI()
+    scheduler = _ChunkScheduler(workers=3, job_concurrency=2)
+
+    bulk = make_job(ai, "bulk", 20, scheduler)
+    small = make_job(ai, "small", 4, scheduler)
+
+    # The bulk job holds two workers at most, so the small job finishes while it is stuck
+    finished = wait_done(small)
+    assert sorted(position for positions, _, _ in finished for position in positions) == [0, 1, 2, 3]
+    assert small.progress == 1.0 and not bulk.done
+
+    ai.release.set()
+    wait_done(bulk)
+    assert bulk.completed == 20 and bulk.failed == 0
+
+
+def test_failed_chunks_are_reported():
+    ai = RecordingAI()
+    scheduler = _ChunkScheduler(workers=2, job_concurrency=2)
+
+    job = ClassificationJob(ai, ["a-ok", "b-bad"], [1, 2], [0, 1], chunk_size=1, scheduler=scheduler)
+
+    finished = sorted(wait_done(job), key=lambda chunk: chunk[0])
+    assert finished[0][1] == [{"app_id": 1, "genre": "Action"}]
+    assert finished[1][1] is None and "unavailable" in finished[1][2]
+    assert job.failed == 1 and job.completed == 2
+
+
+def test_start_classification_skips_empty_selections():
+    import pandas as pd
+
+    df = pd.DataFrame({"appid": [1], "name": ["Doom"]})
+    assert background.start_classification(RecordingAI(), df, []) is None
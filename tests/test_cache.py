@@ -0,0 +1,87 @@
+import pytest
+
+import cache
+from cache import SqliteCache
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock.time)
+    return SqliteCache("test", path=str(tmp_path / "cache.db"), **kwargs), clock
+
+
+def test_roundtrip_and_namespaces(tmp_path, monkeypatch):
+    store, _ = make_cache(tmp_path, monkeypatch)
+    other = SqliteCache("other", path=str(tmp_path / "cache.db"))
+    store.set_many({"a": {"x": 1}, "b": [1, 2]})
+
+    assert store.get_many(["a", "b", "missing"]) == {"a": {"x": 1}, "b": [1, 2]}
+    assert other.get("a") is None
+
+    store.delete("a")
+    assert store.get("a", "default") == "default"
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    store, clock = make_cache(tmp_path, monkeypatch, ttl=60)
+    store.set("key", "value")
+
+    clock.now += 59
+    assert store.get("key") == "value"
+
+    clock.now += 2
+    assert store.get("key") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    store, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    store.set("a", 1)
+    clock.now += 1
+    store.set("b", 2)
+    clock.now += cache.CACHE_TOUCH_INTERVAL
+    # Reading "a" makes "b" the least recently used entry
+    assert store.get("a") == 1
+    clock.now += 1
+    store.set("c", 3)
+
+    assert store.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+def test_recent_reads_do_not_rewrite_access_time(tmp_path, monkeypatch):
+    store, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    store.set("a", 1)
+    clock.now += 1
+    store.set("b", 2)
+    clock.now += 1
+    # Within the touch interval a read leaves "a" as the least recently used entry
+    assert store.get("a") == 1
+    store.set("c", 3)
+
+    assert store.get_many(["a", "b", "c"]) == {"b": 2, "c": 3}
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    connect = cache.sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(cache.sqlite3, "connect", tracking_connect)
+    store, _ = make_cache(tmp_path, monkeypatch)
+    store.set("a", 1)
+    assert store.get("a") == 1
+
+    for conn in opened:
+        with pytest.raises(cache.sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,50 @@
+from group_library import GroupLibrary
+from library import apply_classifications_at
+
+
+def game(app_id, minutes=0):
+    return {"appid": app_id, "name": f"Game {app_id}", "playtime_forever": minutes}
+
+
+def group():
+    library = GroupLibrary({
+        "alice": [game(1, 600), game(2, 0), game(3, 60), game(4)],
+        "bob": [game(1, 300), game(2, 30), game(3)],
+        "carol": [game(2, 0), game(3, 0), game(5)],
+        "dave": None,
+    })
+    styles = {1: "Co-op", 2: "Multiplayer", 3: "Single-player", 4: "Co-op", 5: "Co-op"}
+    apply_classifications_at(library.df, range(len(library.df)), [
+        {"app_id": app_id, "genre": "Action", "play_style": style, "vibe": "Fun"}
+        for app_id, style in styles.items()
+    ])
+    return library
+
+
+def test_members_without_a_library_are_skipped():
+    library = group()
+
+    assert library.members == ["alice", "bob", "carol"]
+    assert library.df["owners"].tolist() == [3, 3, 2, 1, 1]
+
+
+def test_rank_defaults_to_multiplayer_games_everyone_owns():
+    ranked = group().rank()
+
+    assert ranked["appid"].tolist() == [2]
+    assert ranked["missing"].tolist() == [""]
+
+
+def test_rank_with_fewer_owners_lists_who_is_missing():
+    ranked = group().rank(min_owners=2)
+
+    # Most widely owned first, then least played
+    assert ranked["appid"].tolist() == [2, 1]
+    assert ranked["missing"].tolist() == ["", "carol"]
+
+
+def test_rank_filters_by_playtime_and_limit():
+    library = group()
+
+    assert library.rank(min_owners=1, max_hours=1)["appid"].tolist() == [2, 4, 5]
+    assert library.rank(min_owners=1, multiplayer_only=False, limit=2)["appid"].tolist() == [2, 3]
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from library import apply_classifications, apply_classifications_at, build_library
+
+
+def library():
+    return build_library([
+        {"appid": 10, "name": "Doom", "playtime_forever": 300},
+        {"appid": 20, "name": "Doom", "playtime_forever": 200},
+        {"appid": 30, "name": "Quake", "playtime_forever": 100},
+        {"appid": 40, "name": "Portal", "playtime_forever": 50},
+    ], label="Pending")
+
+
+def labels(df, column="Genre"):
+    return df[column].astype(str).tolist()
+
+
+def test_results_are_matched_by_app_id_before_name():
+    df = library()
+    apply_classifications(df, 0, len(df), [
+        {"app_id": 20, "game_name": "Doom", "genre": "Shooter", "play_style": "Solo", "vibe": "Fast"},
+        # A name-only result must not override the app id match above
+        {"game_name": "Doom", "genre": "Puzzle", "play_style": "Co-op", "vibe": "Calm"},
+        {"game_name": "Quake", "genre": "Arena", "play_style": "Multiplayer", "vibe": "Hardcore"},
+    ])
+
+    assert labels(df) == ["Puzzle", "Shooter", "Arena", "Unclassified"]
+    assert labels(df, "Style") == ["Co-op", "Solo", "Multiplayer", "Unclassified"]
+
+
+def test_only_the_given_positions_change():
+    df = library()
+    apply_classifications_at(df, [1, 3], [
+        {"app_id": 20, "genre": "Shooter", "play_style": "Solo", "vibe": "Fast"},
+        {"app_id": 10, "genre": "Shooter", "play_style": "Solo", "vibe": "Fast"},
+    ])
+
+    assert labels(df) == ["Pending", "Shooter", "Pending", "Unclassified"]
+    assert isinstance(df["Genre"].dtype, pd.CategoricalDtype)
+
+
+def test_missing_fields_fall_back_to_unclassified():
+    df = library()
+    apply_classifications_at(df, [2], [{"app_id": 30, "genre": "Arena"}])
+
+    assert labels(df)[2] == "Arena"
+    assert labels(df, "Vibe")[2] == "Unclassified"
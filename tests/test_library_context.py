@@ -0,0 +1,44 @@
+import pandas as pd
+
+from library_context import LibraryIndex, build_library_context
+
+
+def library():
+    return pd.DataFrame([
+        {"name": "Stardew Valley", "playtime_hours": 120.0, "Genre": "Simulation", "Style": "Co-op", "Vibe": "Relaxing"},
+        {"name": "Doom Eternal", "playtime_hours": 30.0, "Genre": "Action", "Style": "Single-player", "Vibe": "Hardcore"},
+        {"name": "Unpacking", "playtime_hours": 0.0, "Genre": "Casual", "Style": "Single-player", "Vibe": "Relaxing"},
+        {"name": "Mystery Game", "playtime_hours": 5.0, "Genre": "Pending", "Style": "Pending", "Vibe": "Pending"},
+    ])
+
+
+def test_search_ranks_rows_by_query_similarity():
+    index = LibraryIndex(library())
+
+    assert index.search("relaxing co-op") == [0, 2]
+    assert index.search("hardcore action")[0] == 1
+    assert len(index.search("relaxing", limit=1)) == 1
+
+
+def test_korean_requests_and_playtime_markers_are_searchable():
+    index = LibraryIndex(library())
+
+    # "힐링" expands to relaxing / casual; unplayed games carry a backlog token
+    assert set(index.search("힐링 게임")) == {0, 2}
+    assert index.search("백로그") == [2]
+
+
+def test_placeholder_labels_and_unknown_words_do_not_match():
+    index = LibraryIndex(library())
+
+    assert index.search("pending") == []
+    assert index.search("zzz") == []
+
+
+def test_context_stays_within_the_token_budget():
+    df = pd.concat([library()] * 200, ignore_index=True)
+
+    context = build_library_context(df, "relaxing co-op", token_budget=300)
+
+    assert context.startswith("Library: 800 games")
+    assert len(context) // 3 <= 300
@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import pytest
+
+import model_router
+from model_router import ModelEndpoint, ModelRouter
+
+
+class Clock:
+    """
+    Stands in for the time module so quota windows and sample expiry need no real waiting.
+    """
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(model_router, "time", fake)
+    return fake
+
+
+def failing(name):
+    def call(llm, callbacks):
+        if llm == name:
+            raise RuntimeError(f"{name} is down")
+        return llm
+    return call
+
+
+def test_errors_fail_over_to_the_next_model(clock):
+    primary, fallback = ModelEndpoint("primary", "primary"), ModelEndpoint("fallback", "fallback")
+    router = ModelRouter({"classify": [primary, fallback], "chat": [primary, fallback]}, hedge_after=0)
+
+    assert router.invoke("classify", failing("primary")) == "fallback"
+    assert router.invoke("chat", failing("primary")) == "fallback"
+
+
+def test_error_is_raised_when_every_model_fails(clock):
+    primary, fallback = ModelEndpoint("primary", "primary"), ModelEndpoint("fallback", "fallback")
+    router = ModelRouter({"chat": [primary, fallback]}, hedge_after=0)
+
+    def call(llm, callbacks):
+        raise RuntimeError(llm)
+
+    with pytest.raises(RuntimeError):
+        router.invoke("chat", call)
+
+
+def test_slow_interactive_call_is_hedged():
+    slow, fast = ModelEndpoint("slow", 0.5), ModelEndpoint("fast", 0.0)
+    router = ModelRouter({"chat": [slow, fast]}, hedge_after=0.05)
+
+    def call(delay, callbacks):
+        time.sleep(delay)
+        return delay
+
+    start = time.perf_counter()
+    assert router.invoke("chat", call) == 0.0
+    assert time.perf_counter() - start < 0.4
+
+
+def test_async_failover(clock):
+    primary, fallback = ModelEndpoint("primary", "primary"), ModelEndpoint("fallback", "fallback")
+    router = ModelRouter({"chat": [primary, fallback]}, hedge_after=0)
+
+    async def call(llm, callbacks):
+        return failing("primary")(llm, callbacks)
+
+    assert asyncio.run(router.ainvoke("chat", call)) == "fallback"
+
+
+def test_background_batches_stay_within_quota_and_keep_the_interactive_reserve(clock):
+    endpoint = ModelEndpoint("model", None, rpm=8)
+    router = ModelRouter({"classify": [endpoint], "chat": [endpoint]})
+
+    # Classification may use 75% of the minute's quota, so 6 of the 10 chunks fit now
+    selected, granted = router.select_batch("classify", 10)
+    assert selected is endpoint and granted == 6
+    assert endpoint.available("classify") == 0
+    assert endpoint.available("chat") == 2
+
+    # The next round waits for the window to move on instead of bursting
+    start = clock.now
+    _, granted = router.select_batch("classify", 4)
+    assert granted == 4
+    assert clock.now - start >= 60
+
+
+def test_exhausted_quota_moves_to_a_model_with_quota(clock):
+    primary, fallback = ModelEndpoint("primary", None, rpm=1), ModelEndpoint("fallback", None)
+    router = ModelRouter({"chat": [primary, fallback]})
+
+    assert router.select("chat") is primary
+    assert router.select("chat") is fallback
+
+
+def test_unhealthy_model_is_probed_and_recovers(clock):
+    primary, fallback = ModelEndpoint("primary", None), ModelEndpoint("fallback", None)
+    router = ModelRouter({"chat": [primary, fallback]})
+    for _ in range(model_router.ROUTER_MIN_SAMPLES):
+        primary.record(1.0, ok=False)
+    assert primary.health() == (False, "errors")
+
+    # The first call after the failures is a probe; the ones right after it are not
+    assert router.select("chat") is primary
+    assert router.select("chat") is fallback
+
+    clock.now += model_router.ROUTER_SAMPLE_MAX_AGE + 1
+    assert primary.health() == (True, "ok")
+    assert router.select("chat") is primary
+
+
+def test_latency_is_tracked_per_purpose(clock):
+    endpoint = ModelEndpoint("model", None)
+    for _ in range(model_router.ROUTER_MIN_SAMPLES):
+        endpoint.record(model_router.ROUTER_LATENCY_THRESHOLD + 1, ok=True, purpose="classify")
+        endpoint.record(0.5, ok=True, purpose="chat")
+
+    assert endpoint.health("classify") == (False, "slow")
+    assert endpoint.health("chat") == (True, "ok")
+
+
+def finished(output_tokens):
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+
+    message = AIMessage(content="answer", usage_metadata={
+        "input_tokens": 100, "output_tokens": output_tokens, "total_tokens": 100 + output_tokens
+    })
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+def test_streamed_latency_is_time_to_first_token(clock, monkeypatch):
+    monkeypatch.setattr(clock, "perf_counter", lambda: clock.now)
+    endpoint = ModelEndpoint("model", None)
+    callback = endpoint.callback_for("chat")
+
+    for run_id in range(model_router.ROUTER_MIN_SAMPLES):
+        callback.on_chat_model_start({}, [], run_id=run_id)
+        clock.now += 1
+        callback.on_llm_new_token("Hi", run_id=run_id)
+        # A long generation after the first token does not count
+        clock.now += 60
+        callback.on_llm_new_token(" there", run_id=run_id)
+        callback.on_llm_end(finished(2000), run_id=run_id)
+
+    assert endpoint.health("chat") == (True, "ok")
+    assert endpoint._p50("chat") == pytest.approx(1)
+
+
+def test_non_streamed_latency_is_scaled_by_output_tokens(clock, monkeypatch):
+    monkeypatch.setattr(clock, "perf_counter", lambda: clock.now)
+    endpoint = ModelEndpoint("model", None)
+    callback = endpoint.callback_for("classify")
+    limit = model_router.ROUTER_LATENCY_TOKENS
+
+    callback.on_chat_model_start({}, [], run_id="long")
+    clock.now += 40
+    callback.on_llm_end(finished(limit * 8), run_id="long")
+    callback.on_chat_model_start({}, [], run_id="short")
+    clock.now += 3
+    callback.on_llm_end(finished(limit // 2), run_id="short")
+
+    latencies = sorted(seconds for _, seconds in endpoint._latencies["classify"])
+    assert latencies == pytest.approx([3, 5])
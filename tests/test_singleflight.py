@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(flight, fn, callers: int = 5):
+    """
+    Starts `callers` threads calling flight.do("key", fn) and returns their results or errors.
+    """
+    outcomes = [None] * callers
+
+    def call(index):
+        try:
+            outcomes[index] = flight.do("key", fn)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return outcomes
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    assert run_concurrently(flight, fn) == ["value"] * 5
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+
+    def fn():
+        time.sleep(0.2)
+        raise ValueError("upstream failed")
+
+    outcomes = run_concurrently(flight, fn)
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert len(flight) == 0
+
+
+def test_do_many_only_runs_keys_nobody_else_owns():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    owned = []
+
+    def slow(keys):
+        owned.append(list(keys))
+        started.set()
+        release.wait(5)
+        return {key: key * 10 for key in keys}
+
+    first = threading.Thread(target=flight.do_many, args=([1, 2], slow))
+    first.start()
+    started.wait(5)
+
+    results = {}
+    second = threading.Thread(target=lambda: results.update(flight.do_many([2, 3], slow)))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert owned == [[1, 2], [3]]
+    assert results == {2: 20, 3: 30}
+
+
+def test_async_calls_share_one_upstream_call():
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_async_waiters_redo_the_work_when_the_owner_is_cancelled():
+    flight = AsyncSingleFlight("test")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def main():
+        owner = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+    assert len(calls) == 2
+
+
+def test_async_cancelled_waiter_leaves_the_shared_call_running():
+    flight = AsyncSingleFlight("test")
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        owner = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(main()) == "value"
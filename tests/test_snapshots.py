@@ -0,0 +1,65 @@
+import snapshots
+from snapshots import LibrarySnapshotStore, diff_games
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def games(**playtimes):
+    return [{"appid": int(app_id[1:]), "playtime_forever": minutes} for app_id, minutes in playtimes.items()]
+
+
+def test_diff_games_reports_new_removed_and_played_apps():
+    old = games(a1=10, a2=20, a3=30)
+    new = games(a2=20, a3=45, a4=0)
+
+    assert diff_games(old, new) == {"new": [4], "removed": [1], "playtime": {3: 15}}
+    assert diff_games(None, new)["new"] == [2, 3, 4]
+
+
+def test_snapshots_roundtrip_with_labels(tmp_path):
+    store = LibrarySnapshotStore(path=str(tmp_path / "cache.db"))
+    assert store.load("1") is None
+
+    store.save("1", games(a10=5), {10: ["Action", "Single-player", "Fast"]})
+    store.save_labels("1", {10: ["RPG", "Co-op", "Calm"]})
+
+    snapshot = store.load("1")
+    assert snapshot["games"] == games(a10=5)
+    assert snapshot["labels"] == {10: ["RPG", "Co-op", "Calm"]}
+
+
+def test_playtime_since_uses_the_entry_before_the_cutoff(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshots.time, "time", clock.time)
+    store = LibrarySnapshotStore(path=str(tmp_path / "cache.db"))
+
+    store.save("1", games(a1=100, a2=50), {})
+    assert store.playtime_since("1", clock.now) == {}
+
+    clock.now += 86400
+    store.save("1", games(a1=160, a2=50, a3=30), {})
+    clock.now += 86400
+    store.save("1", games(a1=200, a2=80, a3=40), {})
+
+    # Since yesterday's entry; apps added after the baseline are left out
+    assert store.playtime_since("1", clock.now - 86400) == {1: 40, 2: 30, 3: 10}
+    assert store.playtime_since("1", clock.now - 3 * 86400) == {1: 100, 2: 30}
+
+
+def test_old_history_is_pruned(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshots.time, "time", clock.time)
+    store = LibrarySnapshotStore(path=str(tmp_path / "cache.db"))
+
+    store.save("1", games(a1=100), {})
+    clock.now += (snapshots.SNAPSHOT_HISTORY_DAYS + 1) * 86400
+    store.save("1", games(a1=300), {})
+
+    # The first entry is gone, leaving a single entry and nothing to compare
+    assert store.playtime_since("1", 0) == {}
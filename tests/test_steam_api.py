@@ -0,0 +1,93 @@
+import threading
+import time
+
+import steam_api
+from steam_api import SteamHttpClient, TokenBucket, _store_entry
+
+
+def make_client(**kwargs):
+    return SteamHttpClient(pool_size=1, max_retries=3, backoff_base=0.5, backoff_max=30, **kwargs)
+
+
+def test_retry_after_within_the_cap_is_honoured():
+    client, bucket = make_client(), TokenBucket(1.0, 1)
+
+    assert client._retry_delay("store", bucket, 429, "5", attempt=0) == 5.0
+    assert bucket.blocked_until > time.monotonic() + 4
+
+
+def test_long_retry_after_returns_the_response():
+    client, bucket = make_client(), TokenBucket(1.0, 1)
+
+    assert client._retry_delay("store", bucket, 429, "3600", attempt=0) is None
+    # Other callers back off for at most the cap, not the full hour
+    assert bucket.blocked_until <= time.monotonic() + 30
+
+
+def test_successes_and_exhausted_retries_are_returned():
+    client, bucket = make_client(), TokenBucket(1.0, 1)
+
+    assert client._retry_delay("store", bucket, 200, None, attempt=0) is None
+    assert client._retry_delay("store", bucket, 503, None, attempt=3) is None
+    assert 0 < client._retry_delay("store", bucket, 503, None, attempt=0) <= 0.5
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+
+def test_store_entries_keep_only_the_fields_we_read():
+    details = {
+        "steam_appid": 10, "name": "Doom", "type": "game",
+        "genres": [{"id": "1", "description": "Action"}],
+        "categories": [{"id": 2, "description": "Single-player", "extra": True}],
+        "detailed_description": "x" * 10000, "screenshots": [{"path_full": "..."}],
+    }
+    response = FakeResponse(200, {"10": {"success": True, "data": details}}, {"ETag": "abc"})
+
+    entry = _store_entry(10, response, None, {})
+
+    assert entry["data"] == {
+        "steam_appid": 10, "name": "Doom", "type": "game",
+        "genres": [{"id": "1", "description": "Action"}],
+        "categories": [{"id": 2, "description": "Single-player"}],
+    }
+    assert entry["etag"] == "abc"
+    # Revalidating an entry cached before trimming shrinks it too
+    revalidated = _store_entry(10, FakeResponse(304), {**entry, "data": details}, {})
+    assert revalidated["data"] == entry["data"]
+
+
+def test_apps_without_a_store_page_are_cached_as_missing():
+    entry = _store_entry(10, FakeResponse(200, {"10": {"success": False}}), None, {})
+
+    assert entry["data"] is None
+
+
+def test_prefetch_notifies_every_caller(monkeypatch):
+    release = threading.Event()
+
+    def fake_bulk(app_ids):
+        release.wait(5)
+        for app_id in app_ids:
+            yield app_id, None if app_id == 3 else {"name": str(app_id)}
+
+    monkeypatch.setattr(steam_api, "get_game_details_bulk", fake_bulk)
+    first, second = [], []
+
+    assert steam_api.prefetch_game_details([1, 2, 3], on_fetched=first.append) == 3
+    # Already queued, so nothing new is fetched, but the second caller still hears about it
+    assert steam_api.prefetch_game_details([2], on_fetched=second.append) == 0
+    release.set()
+    assert steam_api.wait_for_prefetch(timeout=5)
+
+    # Apps without store data are left out
+    assert first == [{1: {"name": "1"}, 2: {"name": "2"}}]
+    assert second == [{2: {"name": "2"}}]
+    assert not steam_api._prefetch_queued
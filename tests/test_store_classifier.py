@@ -0,0 +1,28 @@
+from store_classifier import GENRE_LABELS, classify_from_store, genre_from_store, play_style_from_store
+
+
+def test_primary_genres_win_over_tag_like_ones():
+    assert genre_from_store({"genres": [{"id": "23"}, {"id": "3"}]}) == "RPG"
+    assert genre_from_store({"genres": [{"id": "23"}, {"id": "999"}]}) == "Indie"
+    assert genre_from_store({"genres": [{"id": "999"}]}) is None
+
+
+def test_play_style_from_categories():
+    assert play_style_from_store({"categories": [{"id": 2}]}) == "Single-player"
+    assert play_style_from_store({"categories": [{"id": 1}, {"id": 2}]}) == "Single-player, Multiplayer"
+    assert play_style_from_store({"categories": [{"id": 36}]}) == "Multiplayer"
+    # Co-op wins over everything else
+    assert play_style_from_store({"categories": [{"id": 2}, {"id": 1}, {"id": 38}]}) == "Co-op"
+    assert play_style_from_store({"categories": []}) is None
+
+
+def test_classification_needs_both_fields():
+    details = {"genres": [{"id": "1", "description": "Acción"}], "categories": [{"id": 2}]}
+
+    assert classify_from_store(details) == {"genre": "Action", "play_style": "Single-player"}
+    assert classify_from_store({"genres": details["genres"]}) is None
+    assert classify_from_store(None) is None
+
+
+def test_llm_genre_choices_match_the_store_labels():
+    assert "Action" in GENRE_LABELS and "Indie" not in GENRE_LABELS
@@ -107,3 +107,25 @@ COL_HOURS = {"ko": "시간", "en": "Hours"}
 COL_GENRE = {"ko": "장르", "en": "Genre"}
 COL_STYLE = {"ko": "스타일", "en": "Style"}
 COL_VIBE = {"ko": "분위기", "en": "Vibe"}
+PERF_PANEL_TOGGLE = {"ko": "📈 성능 패널", "en": "📈 Perf Panel"}
+PERF_SPANS = {"ko": "구간별 지연 시간", "en": "Stage latency"}
+PERF_COUNTERS = {"ko": "카운터", "en": "Counters"}
+PERF_MODELS = {"ko": "모델 라우팅", "en": "Model routing"}
+SNAPSHOT_LOADED = {"ko": "📦 {} 에 저장된 라이브러리를 불러왔습니다. 최신 정보는 새로고침하세요.", "en": "📦 Loaded the library saved at {}. Refresh for the latest."}
+LIBRARY_DELTA = {
+    "ko": "🔄 마지막 동기화 이후: 새 게임 {}개, 삭제 {}개, 플레이 {:.1f}시간",
+    "en": "🔄 Since the last sync: {} new, {} removed, {:.1f} h played"
+}
+RECENT_PLAY_TITLE = {"ko": "🕒 이번 주 플레이", "en": "🕒 Played this week"}
+GROUP_MODE_TOGGLE = {"ko": "👥 그룹 모드", "en": "👥 Group mode"}
+GROUP_IDS_INPUT = {"ko": "Steam ID 목록 (줄바꿈 또는 쉼표로 구분)", "en": "Steam IDs (one per line or comma-separated)"}
+GROUP_HEADER = {"ko": "👥 함께 할 게임 찾기", "en": "👥 Games for the whole group"}
+GROUP_MEMBERS = {"ko": "멤버", "en": "Members"}
+GROUP_UNIQUE_GAMES = {"ko": "전체 게임 (중복 제외)", "en": "Unique games"}
+GROUP_SHARED_BY_ALL = {"ko": "모두 보유", "en": "Owned by everyone"}
+GROUP_MIN_OWNERS = {"ko": "최소 보유 인원", "en": "Minimum owners"}
+GROUP_MAX_HOURS = {"ko": "합산 플레이 시간 상한 (0 = 제한 없음)", "en": "Max combined hours (0 = no limit)"}
+GROUP_MULTIPLAYER_ONLY = {"ko": "협동/멀티만", "en": "Co-op / multiplayer only"}
+GROUP_FAILED_IDS = {"ko": "⚠️ 라이브러리를 불러오지 못했습니다 (비공개 프로필?): {}", "en": "⚠️ Could not load these libraries (private profiles?): {}"}
+COL_OWNERS = {"ko": "보유 인원", "en": "Owners"}
+COL_MISSING = {"ko": "미보유", "en": "Missing"}
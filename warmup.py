@@ -0,0 +1,181 @@
+"""
+Headless warm-up of the shared caches, e.g. from cron before peak hours.
+
+Fetches libraries (or plain app ids), prefetches their Store API details and classifies
+them into the same SQLite caches and library snapshots the Streamlit app reads:
+
+    python warmup.py --steam-ids 76561198000000000 76561198000000001 --limit 200
+    python warmup.py --steam-ids-file ids.txt --concurrency 4 --store-rate 0.5
+    python warmup.py --appids 570 730 1091500 --no-classify
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+import steam_api
+from snapshots import LibrarySnapshotStore
+
+load_dotenv()
+
+
+def read_ids(values: Optional[List[str]], path: Optional[str]) -> List[str]:
+    """
+    Ids from the command line plus one per line from `path` ('#' starts a comment).
+    """
+    ids = list(values or [])
+    if path:
+        with open(path, encoding="utf-8") as f:
+            ids.extend(line.split("#", 1)[0].strip() for line in f)
+    return [value for value in dict.fromkeys(ids) if value]
+
+
+def prefetch_store_details(app_ids: List[int], workers: int) -> Dict[int, Optional[dict]]:
+    """
+    Loads Store API details into the store cache, without the interactive timeout.
+    """
+    return dict(steam_api.get_game_details_bulk(app_ids, max_workers=workers, timeout=None))
+
+
+def classify(ai, names: List[str], app_ids: List[int], args) -> List[dict]:
+    if ai is None or not names:
+        return []
+    result = ai.classify_games(
+        names, app_ids=app_ids,
+        batch_size=args.batch_size, max_concurrency=args.llm_concurrency,
+        use_store_metadata=not args.no_store_metadata
+    )
+    return result.get("games", [])
+
+
+def warm_library(steam_id: str, ai, store: Optional[LibrarySnapshotStore], args) -> dict:
+    """
+    Fetches one library, classifies its most played games and saves a snapshot with the labels.
+    """
+    start = time.perf_counter()
+    games = steam_api.get_owned_games(steam_id)
+    if games is None:
+        return {"steam_id": steam_id, "ok": False, "error": "GetOwnedGames failed"}
+
+    # Same order as the app, so --limit matches its "Top N"
+    ranked = sorted(games, key=lambda game: game.get("playtime_forever", 0), reverse=True)
+    head = ranked[:args.limit] if args.limit else ranked
+    app_ids = [int(game["appid"]) for game in head]
+    names = [game.get("name", str(game["appid"])) for game in head]
+
+    if not args.no_store_metadata:
+        prefetch_store_details(app_ids, args.store_workers)
+    classified = classify(ai, names, app_ids, args)
+
+    if store is not None:
+        previous = store.load(steam_id)
+        owned = {int(game["appid"]) for game in games}
+        labels = {app_id: value for app_id, value in (previous or {}).get("labels", {}).items() if app_id in owned}
+        for item in classified:
+            fields = [item.get("genre"), item.get("play_style"), item.get("vibe")]
+            if item.get("app_id") is not None and all(fields):
+                labels[int(item["app_id"])] = fields
+        store.save(steam_id, games, labels)
+
+    return {
+        "steam_id": steam_id,
+        "ok": True,
+        "games": len(games),
+        "classified": len(classified),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def warm_appids(app_ids: List[int], ai, args) -> dict:
+    """
+    Prefetches store details for bare app ids and classifies those with a store name.
+    """
+    start = time.perf_counter()
+    details = prefetch_store_details(app_ids, args.store_workers)
+    named = [(app_id, data["name"]) for app_id, data in details.items() if data and data.get("name")]
+    classified = classify(ai, [name for _, name in named], [app_id for app_id, _ in named], args)
+    return {
+        "appids": len(app_ids),
+        "ok": True,
+        "store_pages": len(named),
+        "classified": len(classified),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the SHELF caches for a list of Steam IDs or app ids.")
+    parser.add_argument("--steam-ids", nargs="+", help="Steam IDs whose libraries to warm")
+    parser.add_argument("--steam-ids-file", help="File with one Steam ID per line")
+    parser.add_argument("--appids", nargs="+", help="App ids to warm without a library")
+    parser.add_argument("--appids-file", help="File with one app id per line")
+    parser.add_argument("--limit", type=int, default=0, help="Most played games to classify per library (0 = all)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Libraries processed at the same time")
+    parser.add_argument("--store-workers", type=int, default=steam_api.STORE_DETAILS_WORKERS,
+                        help="Concurrent Store API requests")
+    parser.add_argument("--store-rate", type=float, help="Store API requests per second (default: STEAM_STORE_API_RATE)")
+    parser.add_argument("--web-api-rate", type=float, help="Steam Web API requests per second (default: STEAM_WEB_API_RATE)")
+    parser.add_argument("--batch-size", type=int, help="Games per LLM request (default: CLASSIFY_BATCH_SIZE)")
+    parser.add_argument("--llm-concurrency", type=int, help="Concurrent LLM requests (default: CLASSIFY_MAX_CONCURRENCY)")
+    parser.add_argument("--no-classify", action="store_true", help="Only fetch libraries and store details")
+    parser.add_argument("--no-store-metadata", action="store_true", help="Skip the Store API and classify with the LLM only")
+    parser.add_argument("--no-snapshots", action="store_true", help="Do not save library snapshots")
+    parser.add_argument("--json", dest="json_path", help="Write the per-library results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    steam_ids = read_ids(args.steam_ids, args.steam_ids_file)
+    app_ids = [int(value) for value in read_ids(args.appids, args.appids_file)]
+    if not steam_ids and not app_ids:
+        parser.error("give --steam-ids/--steam-ids-file or --appids/--appids-file")
+
+    # Rate limits are read when a host's bucket is first created, so set them before any request
+    for host, rate in (("store.steampowered.com", args.store_rate), ("api.steampowered.com", args.web_api_rate)):
+        if rate:
+            steam_api.RATE_LIMITS[host] = (rate, steam_api.RATE_LIMITS[host][1])
+
+    if steam_ids and not os.getenv("STEAM_API_KEY"):
+        print("STEAM_API_KEY is not set.")
+        return 1
+
+    ai = None
+    if not args.no_classify:
+        if not (os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")):
+            print("GEMINI_API_KEY is not set; use --no-classify to only warm Steam data.")
+            return 1
+        from ai_recommender import AIRecommender
+        ai = AIRecommender()
+
+    store = None if args.no_snapshots else LibrarySnapshotStore()
+
+    results = []
+    if app_ids:
+        results.append(warm_appids(app_ids, ai, args))
+        print(f"appids: {results[-1]}")
+
+    # Libraries sharing popular titles are coalesced by the classification single-flight layer
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = {steam_id: executor.submit(warm_library, steam_id, ai, store, args) for steam_id in steam_ids}
+        for steam_id, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"steam_id": steam_id, "ok": False, "error": str(e)}
+            results.append(result)
+            print(f"{steam_id}: {result}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [result for result in results if not result.get("ok")]
+    print(f"Warmed {len(results) - len(failed)}/{len(results)} targets.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())